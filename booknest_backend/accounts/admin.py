@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.html import format_html
-from .models import User, Genre, Trope, Book
+from .models import User, Genre, Trope, Book, TranslationJob
 
 class GenreAdmin(admin.ModelAdmin):
     list_display = ['name_ru', 'name_en', 'name_kk']
@@ -26,6 +26,11 @@ class BookAdmin(admin.ModelAdmin):
         })
     )
 
+class TranslationJobAdmin(admin.ModelAdmin):
+    list_display = ['book', 'target_lang', 'status', 'attempts', 'next_attempt_at', 'created_date']
+    list_filter = ['status', 'target_lang']
+    readonly_fields = ['last_error']
+
 class UserAdmin(BaseUserAdmin):
     list_display = ('email', 'username', 'avatar_preview', 'role', 'is_staff', 'is_active', 'created_date')
     list_filter = ('is_staff', 'is_superuser', 'is_active', 'role')
@@ -57,4 +62,5 @@ class UserAdmin(BaseUserAdmin):
 admin.site.register(User, UserAdmin)
 admin.site.register(Genre, GenreAdmin)
 admin.site.register(Trope, TropeAdmin)
-admin.site.register(Book, BookAdmin)
\ No newline at end of file
+admin.site.register(Book, BookAdmin)
+admin.site.register(TranslationJob, TranslationJobAdmin)
\ No newline at end of file
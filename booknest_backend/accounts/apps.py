@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    def ready(self):
+        from django.db.models.signals import post_save
+        from .authentication import user_saved
+        from .models import User
+        # Кэш claims сбрасывается при любом сохранении пользователя
+        post_save.connect(user_saved, sender=User)
@@ -0,0 +1,108 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import User, ClaimsUser
+
+
+# Поля пользователя, которые кладутся в токен и в короткоживущий кэш
+CLAIM_FIELDS = ('username', 'role', 'is_active', 'token_version')
+
+
+class UserRefreshToken(RefreshToken):
+    # Access-токен копирует claims из refresh-токена
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for field in CLAIM_FIELDS:
+            token[field] = getattr(user, field)
+        return token
+
+
+def _cache():
+    return caches[getattr(settings, 'AUTH_USER_CACHE_ALIAS', 'default')]
+
+
+def _cache_key(user_id):
+    return f'accounts:claims:{user_id}'
+
+
+def get_user_claims(user_id):
+    # Актуальные значения claims: из кэша или одним запросом к БД
+    key = _cache_key(user_id)
+    claims = _cache().get(key)
+    if claims is None:
+        claims = User.objects.filter(pk=user_id).values(*CLAIM_FIELDS).first()
+        if claims is None:
+            return None
+        _cache().set(key, claims, getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 60))
+    return claims
+
+
+def forget_user_claims(user_id):
+    _cache().delete(_cache_key(user_id))
+
+
+def revoke_user_tokens(user_id):
+    # Все ранее выданные токены пользователя перестают приниматься
+    User.objects.filter(pk=user_id).update(token_version=F('token_version') + 1)
+    forget_user_claims(user_id)
+
+
+def user_saved(sender, instance, **kwargs):
+    forget_user_claims(instance.pk)
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    # Для чтения (GET/HEAD/OPTIONS) пользователь собирается из claims без запроса к БД;
+    # версия токена и is_active сверяются с кэшем на AUTH_USER_CACHE_TIMEOUT секунд.
+    # Отзыв виден всем процессам сразу, только если AUTH_USER_CACHE_ALIAS — общий кэш;
+    # иначе другие процессы принимают отозванный токен до истечения записи.
+    # Для записи пользователь, как и раньше, загружается из БД целиком.
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        if request.method in SAFE_METHODS:
+            return self.get_claims_user(validated_token), validated_token
+
+        user = self.get_user(validated_token)
+        self.check_token_version(validated_token, user.token_version)
+        return user, validated_token
+
+    def get_claims_user(self, validated_token):
+        try:
+            # simplejwt хранит id строкой
+            user_id = ClaimsUser._meta.pk.to_python(validated_token[api_settings.USER_ID_CLAIM])
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+
+        claims = get_user_claims(user_id)
+        if claims is None:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+        if not claims['is_active']:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        self.check_token_version(validated_token, claims['token_version'])
+
+        # Остальные поля отложены и загрузятся, только если view к ним обратится
+        known = {'id': user_id, **claims}
+        field_names = [field.attname for field in ClaimsUser._meta.concrete_fields if field.attname in known]
+        return ClaimsUser.from_db('default', field_names, [known[name] for name in field_names])
+
+    def check_token_version(self, validated_token, token_version):
+        # Токены, выданные до появления версии, считаются версией 0
+        if validated_token.get('token_version', 0) != token_version:
+            raise AuthenticationFailed('Token has been revoked', code='token_revoked')
@@ -0,0 +1,51 @@
+import time
+
+from django.contrib.auth import authenticate
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import User
+from accounts.serializers import UserLoginSerializer
+
+
+EMAIL = 'bench-login@booknest.local'
+PASSWORD = 'bench-login-password'
+
+
+def legacy_login():
+    # Прежний путь: отладочная проверка пароля, затем authenticate и полный save()
+    user = User.objects.get(email=EMAIL)
+    user.check_password(PASSWORD)
+    user = User.objects.get(email=EMAIL)
+    user = authenticate(username=user.email, password=PASSWORD)
+    user.last_login = timezone.now()
+    user.save()
+
+
+def current_login():
+    serializer = UserLoginSerializer(data={'email': EMAIL, 'password': PASSWORD})
+    serializer.is_valid(raise_exception=True)
+    user = serializer.validated_data['user']
+    User.objects.filter(pk=user.pk).update(last_login=timezone.now())
+
+
+class Command(BaseCommand):
+    help = 'Compare logins/sec on one core for the old and the current login path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, **options):
+        # Временный пользователь живёт только внутри откатываемой транзакции
+        with transaction.atomic():
+            User.objects.create_user(EMAIL, 'bench-login', PASSWORD)
+            for name, func in (('legacy (2 hashes, 3 queries, full save)', legacy_login),
+                               ('current (1 hash, 1 query, last_login update)', current_login)):
+                func()
+                started = time.perf_counter()
+                for _ in range(options['repeat']):
+                    func()
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f'{name}: {options["repeat"] / elapsed:.1f} logins/sec')
+            transaction.set_rollback(True)
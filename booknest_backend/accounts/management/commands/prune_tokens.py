@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.token_blacklist import prune_expired_tokens
+
+
+class Command(BaseCommand):
+    help = 'Delete expired outstanding and blacklisted JWT refresh tokens in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--pause', type=float, default=0.1,
+                            help='Seconds to sleep between batches to let other writers through')
+        parser.add_argument('--interval', type=float, default=3600.0,
+                            help='Seconds to sleep when there is nothing left to delete')
+        parser.add_argument('--once', action='store_true',
+                            help='Delete all expired tokens and exit')
+
+    def handle(self, *args, **options):
+        while True:
+            deleted = prune_expired_tokens(options['batch_size'])
+            if deleted:
+                self.stdout.write(f'Deleted {deleted} expired tokens')
+                time.sleep(options['pause'])
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
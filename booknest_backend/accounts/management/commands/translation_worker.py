@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.translation import process_jobs, get_translator
+
+
+class Command(BaseCommand):
+    help = 'Process queued book description translations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Process the queue until empty and exit')
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_jobs(options['batch_size'])
+            if processed:
+                self.stdout.write(f'Processed {processed} translation jobs')
+                continue
+            if options['once']:
+                stats = get_translator().stats
+                self.stdout.write(
+                    f"Translation cache: {stats['memory_hits']} memory hits, "
+                    f"{stats['db_hits']} db hits, {stats['misses']} misses"
+                )
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+# Индекс для prune_tokens: поиск истёкших токенов без полного просмотра таблицы
+CREATE_INDEXES_SQL = [
+    'CREATE INDEX IF NOT EXISTS token_blacklist_outstanding_expires_idx '
+    'ON token_blacklist_outstandingtoken (expires_at);',
+]
+
+DROP_INDEXES_SQL = [
+    'DROP INDEX IF EXISTS token_blacklist_outstanding_expires_idx;',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_user_token_version'),
+        ('token_blacklist', '0013_alter_blacklistedtoken_options_and_more'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_INDEXES_SQL, DROP_INDEXES_SQL),
+    ]
@@ -2,8 +2,6 @@ from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, Permis
 from django.db import models
 from django.utils import timezone
 
-from .utils import auto_translate
-
 class Genre(models.Model):
     name_ru = models.CharField(max_length=100)
     name_en = models.CharField(max_length=100)
@@ -48,13 +46,59 @@ class Book(models.Model):
         return desc if desc else self.description_ru
     
     def save(self, *args, **kwargs):
-        # Автоматический перевод при сохранении
-        if not self.description_en:
-            self.description_en = auto_translate(self.description_ru, 'en')
-        if not self.description_kk:
-            self.description_kk = auto_translate(self.description_ru, 'kk')
-        
         super().save(*args, **kwargs)
+        
+        # Перевод выполняет воркер (manage.py translation_worker), сохранение не ждёт сети
+        for language in TranslationJob.LANGUAGES:
+            if not getattr(self, f'description_{language}'):
+                TranslationJob.enqueue(self, language)
+
+
+class TranslationJob(models.Model):
+    LANGUAGES = ('en', 'kk')
+    
+    STATUS_PENDING = 'pending'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    )
+    
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='translation_jobs')
+    target_lang = models.CharField(max_length=10)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    created_date = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='translation_job_queue_idx'),
+        ]
+    
+    def __str__(self):
+        return f'{self.book_id} -> {self.target_lang} ({self.status})'
+    
+    @classmethod
+    def enqueue(cls, book, language):
+        cls.objects.get_or_create(book=book, target_lang=language, status=cls.STATUS_PENDING)
+
+class TranslationCache(models.Model):
+    source_hash = models.CharField(max_length=64)
+    source_lang = models.CharField(max_length=10)
+    target_lang = models.CharField(max_length=10)
+    backend = models.CharField(max_length=50)
+    translated_text = models.TextField()
+    created_date = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        unique_together = ('source_hash', 'source_lang', 'target_lang', 'backend')
+    
+    def __str__(self):
+        return f'{self.source_hash[:12]} {self.source_lang}->{self.target_lang} ({self.backend})'
 
 class UserManager(BaseUserManager):
     def create_user(self, email, username, password=None, **extra_fields):
@@ -94,6 +138,8 @@ class User(AbstractBaseUser, PermissionsMixin):
     age = models.IntegerField(null=True, blank=True)
     city = models.CharField(max_length=100, null=True, blank=True)
     bio = models.TextField(max_length=500, null=True, blank=True)
+    # Увеличивается при отзыве токенов: JWT со старой версией больше не принимаются
+    token_version = models.PositiveIntegerField(default=0)
     
     objects = UserManager()
     
@@ -110,4 +156,17 @@ class User(AbstractBaseUser, PermissionsMixin):
     def avatar_url(self):
         if self.avatar:
             return self.avatar.url
-        return '/media/avatars/default-avatar.png'
\ No newline at end of file
+        return '/media/avatars/default-avatar.png'
+
+
+class ClaimsUser(User):
+    # Пользователь, собранный из claims JWT (accounts/authentication.py). Остальные поля
+    # отложены: первое обращение к любому из них загружает все сразу одним запросом.
+    class Meta:
+        proxy = True
+    
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred and set(fields) <= deferred:
+            fields = list(deferred)
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
\ No newline at end of file
@@ -4,6 +4,10 @@ from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from .models import User
 from .serializers import UserSerializer
+import logging
+
+
+logger = logging.getLogger('accounts.profile')
 
 
 class UserProfileView(APIView):
@@ -24,6 +28,7 @@ class UserProfileView(APIView):
             }
             return Response(data, status=status.HTTP_200_OK)
         except Exception as e:
+            logger.exception('profile load failed', extra={'user_id': request.user.pk})
             return Response({
                 'error': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -58,6 +63,7 @@ class UserProfileView(APIView):
             
             return Response(data, status=status.HTTP_200_OK)
         except Exception as e:
+            logger.warning('profile update failed', exc_info=True, extra={'user_id': request.user.pk})
             return Response({
                 'error': str(e)
             }, status=status.HTTP_400_BAD_REQUEST)
@@ -1,5 +1,4 @@
 from rest_framework import serializers
-from django.contrib.auth import authenticate
 from .models import User
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -36,17 +35,17 @@ class UserLoginSerializer(serializers.Serializer):
         password = data.get('password')
         
         if email and password:
-            # FIX: Get the user by email first, then authenticate
-            try:
-                user = User.objects.get(email=email)
-                # Now authenticate with the username (which is the email in this case)
-                user = authenticate(username=user.email, password=password)
-                if not user:
-                    raise serializers.ValidationError('Invalid email or password.')
-                if not user.is_active:
-                    raise serializers.ValidationError('This account is inactive.')
-            except User.DoesNotExist:
+            # Один запрос пользователя и одна проверка хэша. check_password сам перехэширует
+            # пароль (save(update_fields=['password'])), если сменился основной хэшер.
+            user = User.objects.filter(email=email).first()
+            if user is None:
+                # Хэшируем впустую, чтобы по времени ответа нельзя было узнать, есть ли такой email
+                User().set_password(password)
                 raise serializers.ValidationError('Invalid email or password.')
+            if not user.check_password(password):
+                raise serializers.ValidationError('Invalid email or password.')
+            if not user.is_active:
+                raise serializers.ValidationError('This account is inactive.')
         else:
             raise serializers.ValidationError('Must include email and password.')
         
@@ -1,3 +1,299 @@
-from django.test import TestCase
+import json
+import logging
+import sys
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken, BlacklistedToken
+
+from booknest_backend.logs import REDACTED, JsonFormatter, QueueLogHandler, RedactFilter
+
+from .authentication import UserRefreshToken, get_user_claims, revoke_user_tokens
+from . import translation
+from .models import Book, TranslationCache, TranslationJob, User
+from .translation import CachedTranslator, LocalStubBackend
+
+
+class TokenRevocationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader@example.com', 'reader', 'password123')
+
+    def setUp(self):
+        caches[settings.AUTH_USER_CACHE_ALIAS].clear()
+        token = UserRefreshToken.for_user(self.user).access_token
+        self.headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+    def test_revoked_token_is_rejected_on_reads_and_writes(self):
+        self.assertEqual(self.client.get('/api/user/favorites/', **self.headers).status_code, 200)
+        revoke_user_tokens(self.user.pk)
+        self.assertEqual(self.client.get('/api/user/favorites/', **self.headers).status_code, 401)
+        self.assertEqual(self.client.post('/api/user/favorites/', {'book_id': 1}, **self.headers).status_code, 401)
+
+    def test_revocation_clears_cached_claims(self):
+        # Закэшированные claims не должны пережить отзыв
+        self.assertEqual(get_user_claims(self.user.pk)['token_version'], 0)
+        revoke_user_tokens(self.user.pk)
+        self.assertEqual(get_user_claims(self.user.pk)['token_version'], 1)
+
+
+class PruneTokensTests(TestCase):
+    def test_prunes_only_expired_tokens_in_batches(self):
+        user = User.objects.create_user('reader@example.com', 'reader', 'password123')
+        tokens = [UserRefreshToken.for_user(user) for _ in range(5)]
+        tokens[0].blacklist()
+        OutstandingToken.objects.filter(jti__in=[t['jti'] for t in tokens[:3]]).update(
+            expires_at=timezone.now() - timedelta(days=1)
+        )
+
+        call_command('prune_tokens', '--once', '--batch-size', '2', '--pause', '0', stdout=StringIO())
+
+        self.assertEqual(OutstandingToken.objects.count(), 2)
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+
+class LoginTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader@example.com', 'reader', 'password123')
+
+    def login(self, email, password):
+        return self.client.post('/api/auth/login/', {'email': email, 'password': password}, content_type='application/json')
+
+    def user_selects(self, queries):
+        return [query['sql'] for query in queries if query['sql'].startswith('SELECT') and 'FROM "user"' in query['sql']]
+
+    def test_login_succeeds_with_one_user_lookup_and_hash(self):
+        hasher = get_hasher()
+        with CaptureQueriesContext(connection) as queries, \
+                mock.patch.object(type(hasher), 'verify', autospec=True, side_effect=type(hasher).verify) as verify:
+            response = self.login('reader@example.com', 'password123')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertTrue(response.json()['token'])
+        self.assertEqual(verify.call_count, 1)
+        self.assertEqual(len(self.user_selects(queries)), 1)
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_login)
+
+    def test_wrong_password_is_rejected(self):
+        response = self.login('reader@example.com', 'wrong')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['message'], 'Invalid email or password.')
+
+    def test_unknown_email_still_hashes(self):
+        # Время ответа не должно выдавать, зарегистрирован ли email
+        hasher = get_hasher()
+        with mock.patch.object(type(hasher), 'encode', autospec=True, side_effect=type(hasher).encode) as encode:
+            response = self.login('nobody@example.com', 'password123')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['message'], 'Invalid email or password.')
+        self.assertEqual(encode.call_count, 1)
+
+    def test_inactive_account_is_rejected(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        response = self.login('reader@example.com', 'password123')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['message'], 'This account is inactive.')
+
+    def test_old_hash_is_upgraded_on_login(self):
+        User.objects.filter(pk=self.user.pk).update(password=make_password('password123', hasher='pbkdf2_sha1'))
+        self.assertEqual(self.login('reader@example.com', 'password123').status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith(f'{get_hasher().algorithm}$'))
+        self.assertTrue(self.user.check_password('password123'))
+
+
+def log_record(msg='event', args=(), exc_info=None, **extra):
+    record = logging.LogRecord('accounts.test', logging.INFO, __file__, 1, msg, args, exc_info)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+
+class LoggingTests(TestCase):
+    def test_redact_filter_replaces_secrets_at_any_depth(self):
+        data = {'email': 'reader@example.com', 'password': 'secret1', 'profile': {'tokens': [{'refresh': 'r'}]}}
+        record = log_record(data=data, token='t', user_id=7)
+        self.assertTrue(RedactFilter().filter(record))
+        self.assertEqual(record.token, REDACTED)
+        self.assertEqual(record.user_id, 7)
+        self.assertEqual(record.data, {
+            'email': REDACTED, 'password': REDACTED, 'profile': {'tokens': [{'refresh': REDACTED}]}
+        })
+        # Исходный request.data не меняется
+        self.assertEqual(data['password'], 'secret1')
+
+    def test_json_formatter_writes_one_object_per_line(self):
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            record = log_record('user %s', (7,), sys.exc_info(), amount=Decimal('1.50'))
+        line = JsonFormatter().format(record)
+        self.assertNotIn('\n', line)
+        data = json.loads(line)
+        self.assertEqual((data['level'], data['logger'], data['message']), ('INFO', 'accounts.test', 'user 7'))
+        self.assertEqual(data['amount'], '1.50')
+        self.assertIn('ZeroDivisionError', data['exc_info'])
+
+    def test_queue_handler_reports_dropped_records(self):
+        stream = StringIO()
+        handler = QueueLogHandler(stream, maxsize=2)
+        handler.setFormatter(JsonFormatter())
+        # Без слушателя очередь не разгружается: две записи встают в очередь, три теряются
+        handler.listener.stop()
+        for i in range(5):
+            handler.handle(log_record(f'event {i}'))
+        self.assertEqual(handler.dropped, 3)
+
+        handler.listener.start()
+        handler.queue.join()
+        handler.handle(log_record('after'))
+        handler.close()
+
+        messages = [json.loads(line)['message'] for line in stream.getvalue().splitlines()]
+        self.assertEqual(messages, ['event 0', 'event 1', '3 log records dropped: queue is full', 'after'])
+
+    def test_queue_handler_reports_drops_on_close(self):
+        stream = StringIO()
+        handler = QueueLogHandler(stream, maxsize=1)
+        handler.setFormatter(JsonFormatter())
+        handler.listener.stop()
+        handler.handle(log_record('kept'))
+        handler.handle(log_record('lost'))
+        handler.listener.start()
+        handler.close()
+
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual([line['message'] for line in lines], ['kept', '1 log records dropped: queue is full'])
+        self.assertEqual((lines[1]['level'], lines[1]['dropped']), ('WARNING', 1))
+
+
+def create_book(description='Описание'):
+    return Book.objects.create(
+        title='Book', author='Author', description_ru=description, country_ru='Казахстан', year=2020, pages=100
+    )
+
+
+@override_settings(TRANSLATION_BACKEND='accounts.translation.LocalStubBackend')
+class TranslationQueueTests(TestCase):
+
+    def setUp(self):
+        translation._translator = None
+
+    def test_enqueue_is_deduplicated(self):
+        book = create_book()
+        book.save()
+        self.assertEqual(
+            sorted(TranslationJob.objects.values_list('target_lang', 'status')),
+            [('en', 'pending'), ('kk', 'pending')]
+        )
+
+    def test_process_jobs_translates_and_finishes(self):
+        book = create_book()
+        self.assertEqual(translation.process_jobs(), 2)
+        book.refresh_from_db()
+        self.assertEqual((book.description_en, book.description_kk), ('[en] Описание', '[kk] Описание'))
+        self.assertEqual(set(TranslationJob.objects.values_list('status', flat=True)), {'done'})
+        # Переведённая книга при сохранении в очередь больше не попадает
+        book.save()
+        self.assertFalse(TranslationJob.objects.filter(status='pending').exists())
+
+    def test_claimed_jobs_are_postponed(self):
+        create_book()
+        self.assertEqual(len(translation._claim_jobs(10)), 2)
+        self.assertEqual(translation._claim_jobs(10), [])
+
+    def test_failure_backs_off_then_dead_letters(self):
+        create_book()
+        with mock.patch.object(LocalStubBackend, 'translate', side_effect=RuntimeError('backend down')):
+            started = timezone.now()
+            translation.process_jobs()
+            job = TranslationJob.objects.get(target_lang='en')
+            self.assertEqual((job.status, job.attempts, job.last_error), ('pending', 1, 'backend down'))
+            self.assertGreaterEqual(job.next_attempt_at, started + timedelta(seconds=translation.BACKOFF_BASE_SECONDS * 2))
+            # Задача в бэкоффе не берётся, пока не подойдёт next_attempt_at
+            self.assertEqual(translation.process_jobs(), 0)
+
+            TranslationJob.objects.update(attempts=translation.MAX_ATTEMPTS - 1, next_attempt_at=timezone.now())
+            translation.process_jobs()
+        self.assertEqual(set(TranslationJob.objects.values_list('status', flat=True)), {'failed'})
+        self.assertEqual(translation.process_jobs(), 0)
+
+
+@override_settings(TRANSLATION_BACKEND='accounts.translation.LocalStubBackend')
+class TranslationClaimLockTests(TransactionTestCase):
+    # Блокировка строки видна только из другого соединения, поэтому без обёртки в транзакцию
+
+    def test_locked_jobs_are_skipped(self):
+        create_book()
+        locked_job = TranslationJob.objects.get(target_lang='en')
+        locked, release = threading.Event(), threading.Event()
+
+        def hold_lock():
+            try:
+                with transaction.atomic():
+                    TranslationJob.objects.select_for_update().get(pk=locked_job.pk)
+                    locked.set()
+                    release.wait(10)
+            finally:
+                connections.close_all()
+
+        worker = threading.Thread(target=hold_lock)
+        worker.start()
+        try:
+            self.assertTrue(locked.wait(10))
+            claimed = translation._claim_jobs(10)
+        finally:
+            release.set()
+            worker.join()
+        self.assertEqual([job.target_lang for job in claimed], ['kk'])
+
+
+class TranslationCacheTests(TestCase):
+
+    def setUp(self):
+        self.backend = LocalStubBackend()
+        self.translator = CachedTranslator(self.backend, max_size=2)
+
+    def test_memory_db_and_backend_tiers(self):
+        with mock.patch.object(self.backend, 'translate', wraps=self.backend.translate) as backend_translate:
+            # Повтор внутри пачки переводится один раз
+            self.assertEqual(self.translator.translate(['a', 'b', 'a'], 'en'), ['[en] a', '[en] b', '[en] a'])
+            self.assertEqual(backend_translate.call_args.args[0], ['a', 'b'])
+            self.assertEqual(self.translator.stats, {'memory_hits': 0, 'db_hits': 0, 'misses': 2})
+
+            self.translator.translate(['a', 'b'], 'en')
+            self.assertEqual(self.translator.stats, {'memory_hits': 2, 'db_hits': 0, 'misses': 2})
+
+            # Новый процесс: память пуста, переводы берутся из таблицы
+            fresh = CachedTranslator(self.backend)
+            self.assertEqual(fresh.translate(['a', 'b'], 'en'), ['[en] a', '[en] b'])
+            self.assertEqual(fresh.stats, {'memory_hits': 0, 'db_hits': 2, 'misses': 0})
+            self.assertEqual(backend_translate.call_count, 1)
+
+        # Другой язык — другой ключ
+        self.translator.translate(['a'], 'kk')
+        self.assertEqual(self.translator.stats['misses'], 3)
+        self.assertEqual(TranslationCache.objects.count(), 3)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.translator.translate(['a', 'b'], 'en')
+        self.translator.translate(['a'], 'en')
+        self.translator.translate(['c'], 'en')
+        # 'b' использовался давнее всех и вытеснен; 'a' остался в памяти
+        self.assertEqual(len(self.translator._memory), 2)
+        self.translator.translate(['a'], 'en')
+        self.assertEqual(self.translator.stats['memory_hits'], 2)
+        self.translator.translate(['b'], 'en')
+        self.assertEqual(self.translator.stats['db_hits'], 1)
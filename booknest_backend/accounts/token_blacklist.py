@@ -0,0 +1,15 @@
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+
+def prune_expired_tokens(batch_size=1000):
+    # Одна пачка истёкших токенов в своей короткой транзакции, без долгих блокировок
+    ids = list(
+        OutstandingToken.objects.filter(expires_at__lt=timezone.now())
+        .order_by().values_list('id', flat=True)[:batch_size]
+    )
+    if not ids:
+        return 0
+    # Записи чёрного списка удаляются каскадом одним DELETE по token_id
+    OutstandingToken.objects.filter(id__in=ids).only('id').delete()
+    return len(ids)
@@ -0,0 +1,190 @@
+import asyncio
+import hashlib
+import inspect
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Book, TranslationJob, TranslationCache
+
+
+MAX_ATTEMPTS = 5
+BACKOFF_BASE_SECONDS = 30
+MEMORY_CACHE_SIZE = 2048
+
+
+class GoogleTranslateBackend:
+    name = 'google'
+
+    def __init__(self):
+        self._translator = None
+
+    def translate(self, texts, dest_lang, src_lang='ru'):
+        from googletrans import Translator
+
+        # googletrans >= 4.0.1 стал асинхронным: его httpx-клиент привязан к event loop,
+        # поэтому переводчик создаётся и закрывается внутри одного asyncio.run на пачку
+        if inspect.iscoroutinefunction(Translator.translate):
+            result = asyncio.run(self._translate_async(Translator, texts, dest_lang, src_lang))
+        else:
+            if self._translator is None:
+                self._translator = Translator()
+            result = self._translator.translate(texts, dest=dest_lang, src=src_lang)
+        return [translation.text for translation in result]
+
+    async def _translate_async(self, translator_class, texts, dest_lang, src_lang):
+        async with translator_class() as translator:
+            return await translator.translate(texts, dest=dest_lang, src=src_lang)
+
+
+class LocalStubBackend:
+    # Детерминированный перевод без сети — для тестов и локальной разработки
+    name = 'stub'
+
+    def translate(self, texts, dest_lang, src_lang='ru'):
+        return [f'[{dest_lang}] {text}' for text in texts]
+
+
+class CachedTranslator:
+    # Два уровня: LRU в памяти процесса и таблица TranslationCache в БД.
+    # Ключ — sha256 исходного текста + языки + имя бэкенда.
+
+    def __init__(self, backend, max_size=MEMORY_CACHE_SIZE):
+        self.backend = backend
+        self.max_size = max_size
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'db_hits': 0, 'misses': 0}
+
+    def _key(self, text, dest_lang, src_lang):
+        source_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        return (source_hash, src_lang, dest_lang, self.backend.name)
+
+    def _remember(self, key, translated):
+        with self._lock:
+            self._memory[key] = translated
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_size:
+                self._memory.popitem(last=False)
+
+    def translate(self, texts, dest_lang, src_lang='ru'):
+        keys = [self._key(text, dest_lang, src_lang) for text in texts]
+        found = {}
+
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    found[key] = self._memory[key]
+                    self._memory.move_to_end(key)
+                    self.stats['memory_hits'] += 1
+
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        if missing:
+            rows = TranslationCache.objects.filter(
+                source_hash__in=[key[0] for key in missing],
+                source_lang=src_lang,
+                target_lang=dest_lang,
+                backend=self.backend.name,
+            ).values_list('source_hash', 'translated_text')
+            for source_hash, translated in rows:
+                key = (source_hash, src_lang, dest_lang, self.backend.name)
+                found[key] = translated
+                missing.pop(key, None)
+                self._remember(key, translated)
+                self.stats['db_hits'] += 1
+
+        if missing:
+            # Одинаковые тексты в пачке переводим один раз
+            translations = self.backend.translate(list(missing.values()), dest_lang, src_lang)
+            self.stats['misses'] += len(missing)
+            entries = []
+            for key, translated in zip(missing, translations):
+                found[key] = translated
+                self._remember(key, translated)
+                entries.append(TranslationCache(
+                    source_hash=key[0], source_lang=src_lang, target_lang=dest_lang,
+                    backend=self.backend.name, translated_text=translated,
+                ))
+            TranslationCache.objects.bulk_create(entries, ignore_conflicts=True)
+
+        return [found[key] for key in keys]
+
+
+_translator = None
+
+
+def get_backend():
+    return get_translator().backend
+
+
+def get_translator():
+    global _translator
+    if _translator is None:
+        backend_path = getattr(settings, 'TRANSLATION_BACKEND', 'accounts.translation.GoogleTranslateBackend')
+        _translator = CachedTranslator(import_string(backend_path)())
+    return _translator
+
+
+def _claim_jobs(batch_size):
+    # skip_locked позволяет запускать несколько воркеров параллельно
+    with transaction.atomic():
+        jobs = list(
+            TranslationJob.objects.select_for_update(skip_locked=True)
+            .filter(status=TranslationJob.STATUS_PENDING, next_attempt_at__lte=timezone.now())
+            .select_related('book')
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        # Откладываем взятые задачи, чтобы другой воркер не взял их, пока мы переводим
+        TranslationJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            next_attempt_at=timezone.now() + timedelta(seconds=BACKOFF_BASE_SECONDS)
+        )
+    return jobs
+
+
+def _finish(jobs, translations, language):
+    field = f'description_{language}'
+    with transaction.atomic():
+        for job, text in zip(jobs, translations):
+            # update() вместо save(): не ставим перевод в очередь повторно
+            Book.objects.filter(pk=job.book_id).filter(
+                Q(**{f'{field}__isnull': True}) | Q(**{field: ''})
+            ).update(**{field: text})
+        TranslationJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status=TranslationJob.STATUS_DONE, last_error=''
+        )
+
+
+def _fail(jobs, error):
+    now = timezone.now()
+    for job in jobs:
+        job.attempts += 1
+        job.last_error = str(error)
+        if job.attempts >= MAX_ATTEMPTS:
+            job.status = TranslationJob.STATUS_FAILED
+        job.next_attempt_at = now + timedelta(seconds=BACKOFF_BASE_SECONDS * 2 ** job.attempts)
+    TranslationJob.objects.bulk_update(jobs, ['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+def process_jobs(batch_size=50):
+    jobs = _claim_jobs(batch_size)
+
+    by_language = {}
+    for job in jobs:
+        by_language.setdefault(job.target_lang, []).append(job)
+
+    translator = get_translator()
+    for language, language_jobs in by_language.items():
+        try:
+            translations = translator.translate([job.book.description_ru for job in language_jobs], language)
+        except Exception as e:
+            _fail(language_jobs, e)
+            continue
+        _finish(language_jobs, translations, language)
+
+    return len(jobs)
@@ -1,9 +1,7 @@
-from googletrans import Translator
-
 def auto_translate(text, dest_lang):
-    translator = Translator()
+    from .translation import get_translator
+
     try:
-        translation = translator.translate(text, dest=dest_lang)
-        return translation.text
-    except:
-        return text
\ No newline at end of file
+        return get_translator().translate([text], dest_lang)[0]
+    except Exception:
+        return text
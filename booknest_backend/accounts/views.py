@@ -1,33 +1,35 @@
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
+from .authentication import UserRefreshToken, revoke_user_tokens
 from django.utils import timezone
 from .serializers import UserRegistrationSerializer, UserLoginSerializer, UserSerializer
 from .models import User, Book, Genre, Trope
-import traceback
-from django.core.files.storage import default_storage
+import logging
 import os
 
 
+register_logger = logging.getLogger('accounts.register')
+login_logger = logging.getLogger('accounts.login')
+profile_logger = logging.getLogger('accounts.profile')
+
+
 class RegisterView(APIView):
     permission_classes = [AllowAny]
     
     def post(self, request):
         try:
-            print("=== Registration Request ===")
-            print("Request data:", request.data)
+            # Пароли, токены и email вырезает RedactFilter
+            register_logger.debug('registration request', extra={'data': request.data})
             
             serializer = UserRegistrationSerializer(data=request.data)
             
             if serializer.is_valid():
-                print("Serializer is valid, creating user...")
                 user = serializer.save()
-                print(f"User created: {user.username}")
+                register_logger.info('user registered', extra={'user_id': user.pk})
                 
-                refresh = RefreshToken.for_user(user)
+                refresh = UserRefreshToken.for_user(user)
                 
                 response_data = {
                     'success': True,
@@ -35,12 +37,11 @@ class RegisterView(APIView):
                     'user': UserSerializer(user).data,
                     'token': str(refresh.access_token)
                 }
-                print("Response:", response_data)
                 
                 return Response(response_data, status=status.HTTP_201_CREATED)
             
             # Format errors for frontend
-            print("Serializer errors:", serializer.errors)
+            register_logger.info('registration rejected', extra={'errors': serializer.errors})
             errors = []
             for field, messages in serializer.errors.items():
                 for message in messages:
@@ -52,11 +53,7 @@ class RegisterView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
             
         except Exception as e:
-            print("=== ERROR in RegisterView ===")
-            print(f"Error type: {type(e).__name__}")
-            print(f"Error message: {str(e)}")
-            print("Traceback:")
-            traceback.print_exc()
+            register_logger.exception('registration failed')
             
             return Response({
                 'success': False,
@@ -69,30 +66,15 @@ class LoginView(APIView):
     
     def post(self, request):
         try:
-            print("=== Login Request ===")
-            print("Request data:", request.data)
-            
-            # Debug: Check if user exists
-            from .models import User
-            try:
-                user = User.objects.get(email=request.data.get('email'))
-                print(f"User found: {user.email}, is_active: {user.is_active}")
-                # Test password manually
-                if user.check_password(request.data.get('password')):
-                    print("Password is CORRECT")
-                else:
-                    print("Password is WRONG")
-            except User.DoesNotExist:
-                print("User does not exist with this email")
-            
             serializer = UserLoginSerializer(data=request.data)
             
             if serializer.is_valid():
                 user = serializer.validated_data['user']
+                # Обновляем только last_login, а не все поля пользователя
                 user.last_login = timezone.now()
-                user.save()
+                User.objects.filter(pk=user.pk).update(last_login=user.last_login)
                 
-                refresh = RefreshToken.for_user(user)
+                refresh = UserRefreshToken.for_user(user)
                 
                 response_data = {
                     'success': True,
@@ -100,12 +82,13 @@ class LoginView(APIView):
                     'user': UserSerializer(user).data,
                     'token': str(refresh.access_token)
                 }
-                print("Login successful:", response_data)
+                login_logger.info('login succeeded', extra={'user_id': user.pk})
                 
                 return Response(response_data, status=status.HTTP_200_OK)
             
             # Format errors for frontend
-            print("Login errors:", serializer.errors)
+            # email в лог не пишем: это персональные данные, а id пользователя здесь ещё нет
+            login_logger.info('login rejected')
             error_message = 'Invalid email or password'
             if serializer.errors:
                 error_list = []
@@ -122,10 +105,7 @@ class LoginView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
             
         except Exception as e:
-            print("=== ERROR in LoginView ===")
-            print(f"Error type: {type(e).__name__}")
-            print(f"Error message: {str(e)}")
-            traceback.print_exc()
+            login_logger.exception('login failed')
             
             return Response({
                 'success': False,
@@ -140,9 +120,13 @@ class LogoutView(APIView):
         try:
             refresh_token = request.data.get('refresh_token')
             if refresh_token:
-                token = RefreshToken(refresh_token)
+                token = UserRefreshToken(refresh_token)
                 token.blacklist()
             
+            # Выход на всех устройствах: отзываем и уже выданные access-токены
+            if request.data.get('all_devices'):
+                revoke_user_tokens(request.user.pk)
+            
             return Response({
                 'success': True,
                 'message': 'Logout successful'
@@ -198,9 +182,7 @@ class UserProfileView(APIView):
                 'user': serializer.data
             }, status=status.HTTP_200_OK)
         except Exception as e:
-            print("=== ERROR in UserProfileView ===")
-            print(f"Error: {str(e)}")
-            traceback.print_exc()
+            profile_logger.exception('profile load failed', extra={'user_id': request.user.pk})
             
             return Response({
                 'success': False,
@@ -0,0 +1,133 @@
+import copy
+import json
+import logging
+import queue
+import random
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Значения этих ключей в extra (на любой глубине) заменяются на REDACTED
+SENSITIVE_FIELDS = frozenset({
+    'password', 'password2', 'old_password', 'new_password',
+    'token', 'access', 'refresh', 'refresh_token', 'authorization', 'secret',
+    'email',
+})
+REDACTED = '[REDACTED]'
+
+# Стандартные атрибуты LogRecord: всё остальное пришло через extra
+RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+def redact(value):
+    if hasattr(value, 'items'):
+        return {
+            key: REDACTED if str(key).lower() in SENSITIVE_FIELDS else redact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    return value
+
+
+def record_extra(record):
+    return {key: value for key, value in vars(record).items() if key not in RECORD_ATTRS}
+
+
+class RedactFilter(logging.Filter):
+    # Копирует extra без секретов, исходные объекты (request.data и т.п.) не меняются
+    def filter(self, record):
+        for key, value in record_extra(record).items():
+            setattr(record, key, REDACTED if key.lower() in SENSITIVE_FIELDS else redact(value))
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    # Пропускает долю rate записей ниже WARNING; предупреждения и ошибки — всегда
+    def __init__(self, rate=1.0, name=''):
+        super().__init__(name)
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    # Одна запись — одна строка JSON
+    def format(self, record):
+        data = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            **record_extra(record),
+        }
+        if record.exc_info:
+            data['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data['exc_info'] = record.exc_text
+        if orjson is not None:
+            return orjson.dumps(data, default=str).decode()
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+class DrainingQueueListener(QueueListener):
+    # Сигнал остановки ждёт места в очереди: при полной очереди put_nowait упал бы с queue.Full
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class QueueLogHandler(QueueHandler):
+    # Поток запроса только кладёт запись в очередь; форматирование и запись в stream
+    # выполняет фоновый поток QueueListener. При переполнении очереди записи отбрасываются,
+    # а их число пишется предупреждением, как только в очереди снова появится место.
+
+    def __init__(self, stream=None, maxsize=10000):
+        super().__init__(queue.Queue(maxsize))
+        self.target = logging.StreamHandler(stream)
+        self.dropped = 0
+        self.reported = 0
+        self.listener = DrainingQueueListener(self.queue, self.target)
+        self.listener.start()
+
+    def setFormatter(self, fmt):
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Сообщение собираем сразу: аргументы могут измениться до записи
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def dropped_record(self):
+        count = self.dropped - self.reported
+        record = logging.LogRecord(
+            __name__, logging.WARNING, __file__, 0, '%d log records dropped: queue is full', (count,), None
+        )
+        record.dropped = count
+        return record
+
+    def enqueue(self, record):
+        # Вызывается под блокировкой хендлера, счётчики меняются из одного потока за раз
+        try:
+            if self.dropped > self.reported:
+                self.queue.put_nowait(self.dropped_record())
+                self.reported = self.dropped
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        # logging.shutdown() при выходе закрывает хендлер и дописывает очередь
+        if self.listener._thread is not None:
+            self.listener.stop()
+        if self.dropped > self.reported:
+            self.target.handle(self.dropped_record())
+            self.reported = self.dropped
+        super().close()
@@ -1,7 +1,10 @@
 from pathlib import Path
 from datetime import timedelta
+from importlib.util import find_spec
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -27,6 +30,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework_simplejwt',
     'rest_framework_simplejwt.token_blacklist',
@@ -103,6 +107,17 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# The first hasher is used for new passwords; hashes made with the others are
+# upgraded transparently on the next successful login. Argon2 is preferred
+# when argon2-cffi is installed.
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+if find_spec('argon2'):
+    PASSWORD_HASHERS.insert(0, 'django.contrib.auth.hashers.Argon2PasswordHasher')
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.0/topics/i18n/
@@ -133,14 +148,73 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# Local memory is per-process; use a shared backend (Redis, Memcached) with several workers.
+
+# Shared cache for everything that must agree across worker processes: cache tag
+# versions (ETag/Last-Modified and response keys), filter vocabulary versions and
+# cached JWT claims. Set REDIS_URL in any multi-process deployment; the per-process
+# LocMemCache fallback is only safe with a single process (runserver).
+REDIS_URL = os.environ.get('REDIS_URL')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    } if REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'booknest-default',
+    },
+    # Cached API responses (books/cache.py). For a file-based cache use
+    # 'django.core.cache.backends.filebased.FileBasedCache' with a directory LOCATION.
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'booknest-responses',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    # Per-user responses (favorites, current book, charts). LocMemCache evicts
+    # least recently used entries once MAX_ENTRIES is reached.
+    'user_data': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'booknest-user-data',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+RESPONSE_CACHE_ALIAS = 'responses'
+RESPONSE_CACHE_TIMEOUT = 300
+USER_CACHE_ALIAS = 'user_data'
+# Tag versions live in the shared cache; response bodies may stay per process
+# because their keys include the versions. Without a shared cache, versions
+# expire after CACHE_TAG_TIMEOUT seconds so other processes' writes show up.
+CACHE_TAG_ALIAS = 'default'
+CACHE_TAG_TIMEOUT = None if REDIS_URL else 10
+
+if not DEBUG and CACHES[CACHE_TAG_ALIAS]['BACKEND'].endswith('LocMemCache'):
+    raise ImproperlyConfigured(
+        'Cache tag versions need a cache shared by all processes outside DEBUG: set REDIS_URL.'
+    )
+
+
+# Translation backend used by `manage.py translation_worker`
+# ('accounts.translation.LocalStubBackend' translates deterministically without network)
+
+TRANSLATION_BACKEND = 'accounts.translation.GoogleTranslateBackend'
+
+
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.StatelessJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.AllowAny',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'books.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 }
 
 
@@ -154,6 +228,14 @@ SIMPLE_JWT = {
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
 }
 
+# Read-only requests authenticate from JWT claims; the user's current token
+# version and is_active are cached for AUTH_USER_CACHE_TIMEOUT seconds
+# (accounts/authentication.py). Revocation deletes the entry, so with a shared
+# cache (REDIS_URL) it takes effect immediately in every process; with the
+# per-process fallback other processes accept revoked tokens until the entry expires.
+AUTH_USER_CACHE_ALIAS = 'default'
+AUTH_USER_CACHE_TIMEOUT = 60 if REDIS_URL else 5
+
 
 # CORS Settings
 CORS_ALLOWED_ORIGINS = [
@@ -176,4 +258,57 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
-]
\ No newline at end of file
+]
+
+# In-memory facet index for /api/books/search/ (genres, tropes, countries, authors, age_rating).
+# Each process keeps its own copy (sorted id arrays, built and refreshed in a background thread;
+# until the first build finishes search falls back to SQL filters without facet counts).
+BOOKS_FACET_INDEX = False
+
+# Buffered reading progress (books/progress.py): page updates are coalesced per
+# (user, book) in process memory and written in batches. Pending updates of a
+# user are flushed before their current book is read.
+READING_PROGRESS_BUFFER = False
+READING_PROGRESS_BUFFER_SIZE = 500
+READING_PROGRESS_FLUSH_INTERVAL = 5
+
+# Structured logging (booknest_backend/logs.py): JSON lines on stdout written by a
+# background QueueListener thread, so request threads never block on I/O.
+# Sensitive keys in `extra` are redacted; INFO/DEBUG of hot loggers is sampled.
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+LOG_SAMPLE_RATES = {
+    'accounts.login': float(os.environ.get('LOG_SAMPLE_LOGIN', '0.1')),
+    'accounts.profile': float(os.environ.get('LOG_SAMPLE_PROFILE', '0.1')),
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'booknest_backend.logs.JsonFormatter'},
+    },
+    'filters': {
+        'redact': {'()': 'booknest_backend.logs.RedactFilter'},
+        **{
+            f'sample:{name}': {'()': 'booknest_backend.logs.SamplingFilter', 'rate': rate}
+            for name, rate in LOG_SAMPLE_RATES.items()
+        },
+    },
+    'handlers': {
+        'queue': {
+            '()': 'booknest_backend.logs.QueueLogHandler',
+            'stream': 'ext://sys.stdout',
+            'formatter': 'json',
+            'filters': ['redact'],
+        },
+    },
+    'root': {'handlers': ['queue'], 'level': 'WARNING'},
+    'loggers': {
+        'django': {'handlers': ['queue'], 'level': 'INFO', 'propagate': False},
+        'accounts': {'handlers': ['queue'], 'level': LOG_LEVEL, 'propagate': False},
+        **{
+            name: {'filters': [f'sample:{name}']}
+            for name in LOG_SAMPLE_RATES
+        },
+    },
+}
@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class BooksConfig(AppConfig):
     name = 'books'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+        from . import signals
+        from .reading_stats import partitions_migrated
+        post_migrate.connect(partitions_migrated, sender=self)
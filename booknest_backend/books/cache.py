@@ -0,0 +1,163 @@
+import hashlib
+import json
+import threading
+import time
+from collections import Counter
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+
+LOCK_TIMEOUT = 10
+LOCK_POLL_INTERVAL = 0.05
+ALL_TAG = 'all'
+TRACKED_USERS = 1000
+
+_stats_lock = threading.Lock()
+_stats = {}
+_user_invalidations = Counter()
+_started = time.monotonic()
+
+
+def _count(alias, name):
+    with _stats_lock:
+        stats = _stats.setdefault(alias, {'hits': 0, 'misses': 0, 'waits': 0})
+        stats[name] += 1
+
+
+def response_cache_stats(alias=None):
+    alias = alias or getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')
+    with _stats_lock:
+        stats = dict(_stats.get(alias, {'hits': 0, 'misses': 0, 'waits': 0}))
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+    return stats
+
+
+def user_cache_stats(top=10):
+    stats = response_cache_stats(getattr(settings, 'USER_CACHE_ALIAS', 'default'))
+    with _stats_lock:
+        stats['invalidations'] = sum(_user_invalidations.values())
+        stats['top_invalidated_users'] = _user_invalidations.most_common(top)
+    minutes = (time.monotonic() - _started) / 60
+    stats['invalidations_per_minute'] = stats['invalidations'] / minutes if minutes else 0.0
+    return stats
+
+
+def tag_cache():
+    # Версии тегов должны быть общими для всех процессов, иначе процесс, не видевший
+    # записи, будет отдавать старые ответы и 304 бесконечно
+    return caches[getattr(settings, 'CACHE_TAG_ALIAS', 'default')]
+
+
+def _tag_timeout():
+    return getattr(settings, 'CACHE_TAG_TIMEOUT', None)
+
+
+def _tag_key(tag):
+    return f'books:tag:{tag}'
+
+
+def invalidate(*tags):
+    # Ключи ответов содержат версии тегов: новая версия = промах, старые записи истекают сами
+    tag_cache().set_many({_tag_key(tag): time.time_ns() for tag in tags}, _tag_timeout())
+
+
+def invalidate_all():
+    invalidate(ALL_TAG)
+
+
+def user_tag(user_id):
+    return f'user:{user_id}'
+
+
+def invalidate_users(user_ids):
+    # Личные данные пользователя (избранное, текущая книга, подборки) — одна версия на пользователя
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+    invalidate(*(user_tag(user_id) for user_id in user_ids))
+    with _stats_lock:
+        _user_invalidations.update(user_ids)
+        # Счётчики храним только для самых активных пользователей
+        if len(_user_invalidations) > 2 * TRACKED_USERS:
+            kept = _user_invalidations.most_common(TRACKED_USERS)
+            _user_invalidations.clear()
+            _user_invalidations.update(dict(kept))
+
+
+def invalidate_user(user_id):
+    invalidate_users([user_id])
+
+
+def tag_versions(tags):
+    cache = tag_cache()
+    keys = [_tag_key(tag) for tag in tags]
+    versions = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        for key, version in missing.items():
+            cache.add(key, version, _tag_timeout())
+        versions.update(cache.get_many(list(missing)))
+    return [versions.get(key) for key in keys]
+
+
+def response_cache_key(view_name, request, kwargs, tags):
+    # Параметры запроса нормализуем: порядок и повторы не должны давать разные ключи
+    params = sorted((key, sorted(values)) for key, values in request.GET.lists())
+    # Имена тегов тоже в ключе: по ним различаются личные ответы (например favorites:<user>)
+    payload = json.dumps([params, sorted(kwargs.items()), list(tags), tag_versions(tags)], default=str)
+    return f'books:response:{view_name}:{hashlib.sha256(payload.encode()).hexdigest()}'
+
+
+# Кэширует успешные ответы GET-метода APIView. tags(request, **kwargs) возвращает теги,
+# по которым ответ сбрасывается через invalidate(). Одновременные промахи по одному ключу
+# пересчитывает только один запрос, остальные ждут его результат.
+# alias_setting — настройка с алиасом кэша для самих ответов; версии тегов всегда
+# хранятся в общем кэше CACHE_TAG_ALIAS.
+def cached_response(tags, timeout=None, alias_setting='RESPONSE_CACHE_ALIAS'):
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            cache_alias = getattr(settings, alias_setting, 'default')
+            cache = caches[cache_alias]
+            key = response_cache_key(
+                type(self).__name__, request, kwargs, [ALL_TAG] + list(tags(request, **kwargs))
+            )
+
+            data = cache.get(key)
+            if data is not None:
+                _count(cache_alias, 'hits')
+                return Response(data, headers={'X-Cache': 'HIT'})
+
+            lock_key = f'{key}:lock'
+            locked = cache.add(lock_key, 1, LOCK_TIMEOUT)
+            if not locked:
+                _count(cache_alias, 'waits')
+                deadline = time.monotonic() + LOCK_TIMEOUT
+                while time.monotonic() < deadline:
+                    time.sleep(LOCK_POLL_INTERVAL)
+                    data = cache.get(key)
+                    if data is not None:
+                        _count(cache_alias, 'hits')
+                        return Response(data, headers={'X-Cache': 'HIT'})
+                    if cache.get(lock_key) is None:
+                        break
+
+            _count(cache_alias, 'misses')
+            try:
+                response = method(self, request, *args, **kwargs)
+                if response.status_code == 200:
+                    cache.set(
+                        key, response.data,
+                        timeout if timeout is not None else getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+                    )
+                response['X-Cache'] = 'MISS'
+                return response
+            finally:
+                if locked:
+                    cache.delete(lock_key)
+        return wrapper
+    return decorator
@@ -0,0 +1,34 @@
+import hashlib
+from datetime import datetime, timezone
+
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+from .cache import ALL_TAG, tag_versions, user_tag
+
+
+def _digest(*parts):
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def tag_conditional(tags):
+    # Валидаторы из версий тегов кэша ответов, без запросов к БД
+    def versions(request, **kwargs):
+        return tag_versions([ALL_TAG] + list(tags(request, **kwargs)))
+
+    def etag(request, **kwargs):
+        return _digest(request.get_full_path(), list(tags(request, **kwargs)), versions(request, **kwargs))
+
+    def last_modified(request, **kwargs):
+        return datetime.fromtimestamp(max(versions(request, **kwargs)) / 1e9, tz=timezone.utc)
+
+    return method_decorator(condition(etag_func=etag, last_modified_func=last_modified))
+
+
+def user_tags(request, **kwargs):
+    # Личные ответы зависят только от версии пользователя: изменения вложенных книг
+    # сбрасывают её у тех, у кого книга есть в ответе (signals.invalidate_book_readers)
+    return [user_tag(request.user.pk)]
+
+
+user_conditional = tag_conditional(user_tags)
@@ -0,0 +1,270 @@
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count, F, Lookup
+
+from .models import Book, BookGenre, BookTrope
+
+
+# Фасеты, которые индекс умеет фильтровать и считать
+BOOK_COLUMN_FACETS = {
+    'countries': 'country',
+    'authors': 'author',
+    'age_rating': 'age_rating',
+}
+LINK_FACETS = {
+    'genres': (BookGenre, 'genre__name'),
+    'tropes': (BookTrope, 'trope__name'),
+}
+FACETS = tuple(LINK_FACETS) + tuple(BOOK_COLUMN_FACETS)
+
+# Выше этого числа книг фильтр по списку id из индекса обходится БД дороже JOIN,
+# а выгружать id для счётчиков в Python дороже, чем посчитать их GROUP BY
+MAX_INDEX_IDS = 10000
+
+logger = logging.getLogger('books.facets')
+
+
+def is_enabled():
+    return getattr(settings, 'BOOKS_FACET_INDEX', False)
+
+
+def filter_queryset(books, filters):
+    # SQL-путь фасетных фильтров: без индекса и для слишком широких выборок
+    for facet, values in filters.items():
+        if not values:
+            continue
+        if facet in LINK_FACETS:
+            books = books.filter(**{f'book_{facet}__{LINK_FACETS[facet][1]}__in': values}).distinct()
+        else:
+            books = books.filter(**{f'{BOOK_COLUMN_FACETS[facet]}__in': values})
+    return books
+
+
+class AnyId(Lookup):
+    # Список id уходит в PostgreSQL одним параметром-массивом (id = ANY(%s)),
+    # а не тысячами bind-параметров в IN (...)
+    lookup_name = 'any'
+    prepare_rhs = False
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        return f'{lhs} = ANY(%s)', (*lhs_params, self.rhs)
+
+
+def filter_by_ids(books, ids):
+    return books.filter(AnyId(F('id'), list(ids)))
+
+
+def sort_counts(counts):
+    return dict(sorted(counts.items(), key=lambda item: (-item[1], str(item[0]))))
+
+
+def sql_counts(books, filters):
+    # Те же счётчики, что FacetIndex.counts(), но через GROUP BY в БД
+    result = {}
+    for facet in FACETS:
+        base = filter_queryset(books, {name: values for name, values in filters.items() if name != facet})
+        base_ids = base.order_by().values('id')
+        if facet in LINK_FACETS:
+            model, name_field = LINK_FACETS[facet]
+            rows = model.objects.filter(book_id__in=base_ids).order_by().values_list(name_field).annotate(
+                count=Count('book_id', distinct=True)
+            )
+        else:
+            rows = Book.objects.filter(id__in=base_ids).order_by().values_list(BOOK_COLUMN_FACETS[facet]).annotate(
+                count=Count('id')
+            )
+        result[facet] = sort_counts(dict(rows))
+    return result
+
+
+def _add_id(ids, book_id):
+    position = bisect_left(ids, book_id)
+    if position == len(ids) or ids[position] != book_id:
+        ids.insert(position, book_id)
+
+
+def _remove_id(ids, book_id):
+    position = bisect_left(ids, book_id)
+    if position < len(ids) and ids[position] == book_id:
+        del ids[position]
+
+
+class FacetIndex:
+    # Для каждого значения фасета — отсортированный массив id книг (array('q'), 8 байт на id).
+    # Память растёт с числом связей книга–значение, а не с числом значений × max(id).
+    # Индекс строится и периодически перестраивается в фоновом потоке; до первой сборки
+    # is_ready() возвращает False и поиск работает через SQL.
+
+    def __init__(self, max_age=300):
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        self._built_at = None
+        self._building = False
+        # Сборка, начатая до invalidate(), не должна подменить индекс устаревшими данными
+        self._generation = 0
+        # Изменения, пришедшие во время сборки: повторяются на новом индексе после замены
+        self._pending = []
+        self._all = array('q')
+        self._postings = {name: {} for name in FACETS}
+        # Текущие значения колонок книги, чтобы при обновлении убрать её из старых списков
+        self._book_values = {}
+
+    def is_ready(self):
+        with self._lock:
+            stale = self._built_at is None or time.monotonic() - self._built_at > self.max_age
+            if stale and not self._building:
+                self._building = True
+                self._pending = []
+                threading.Thread(
+                    target=self._rebuild_in_background, args=(self._generation,), name='facet-index', daemon=True
+                ).start()
+            # Устаревший индекс продолжает отвечать, пока собирается новый: сигналы держат его актуальным
+            return self._built_at is not None
+
+    def _rebuild_in_background(self, generation):
+        try:
+            self.rebuild(generation)
+        except Exception:
+            logger.exception('facet index rebuild failed')
+            with self._lock:
+                if generation == self._generation:
+                    self._building = False
+                    self._pending = []
+        finally:
+            connections.close_all()
+
+    def rebuild(self, generation=None):
+        postings = {name: {} for name in FACETS}
+        book_values = {}
+
+        columns = list(BOOK_COLUMN_FACETS.values())
+        # order_by('id'): списки заполняются уже отсортированными
+        for row in Book.objects.order_by('id').values_list('id', *columns).iterator():
+            book_id, values = row[0], dict(zip(BOOK_COLUMN_FACETS, row[1:]))
+            book_values[book_id] = values
+            for facet, value in values.items():
+                postings[facet].setdefault(value, array('q')).append(book_id)
+
+        for facet, (model, name_field) in LINK_FACETS.items():
+            for book_id, name in model.objects.order_by('book_id').values_list('book_id', name_field).iterator():
+                postings[facet].setdefault(name, array('q')).append(book_id)
+
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._postings = postings
+            self._book_values = book_values
+            self._all = array('q', book_values)
+            self._built_at = time.monotonic()
+            self._building = False
+            pending, self._pending = self._pending, []
+            for method, args in pending:
+                method(*args)
+
+    def invalidate(self):
+        # После массовых изменений (импорт, переименование жанра) индекс не используется до пересборки
+        with self._lock:
+            self._generation += 1
+            self._built_at = None
+            self._building = False
+            self._pending = []
+
+    def _record(self, method, *args):
+        # True — изменение применять сейчас; во время сборки оно ещё и запоминается для повтора
+        if self._building:
+            self._pending.append((method, args))
+        return self._built_at is not None
+
+    def _set(self, facet, value, book_id, present):
+        values = self._postings[facet]
+        if present:
+            _add_id(values.setdefault(value, array('q')), book_id)
+        elif value in values:
+            _remove_id(values[value], book_id)
+            if not values[value]:
+                del values[value]
+
+    def update_book(self, book):
+        with self._lock:
+            if not self._record(self._update_values, book.id, self._column_values(book)):
+                return
+            self._update_values(book.id, self._column_values(book))
+
+    def _column_values(self, book):
+        return {facet: getattr(book, column) for facet, column in BOOK_COLUMN_FACETS.items()}
+
+    def _update_values(self, book_id, new_values):
+        for facet, value in self._book_values.get(book_id, {}).items():
+            self._set(facet, value, book_id, False)
+        for facet, value in new_values.items():
+            self._set(facet, value, book_id, True)
+        self._book_values[book_id] = new_values
+        _add_id(self._all, book_id)
+
+    def remove_book(self, book_id):
+        with self._lock:
+            if not self._record(self._remove, book_id):
+                return
+            self._remove(book_id)
+
+    def _remove(self, book_id):
+        for facet, value in self._book_values.pop(book_id, {}).items():
+            self._set(facet, value, book_id, False)
+        for facet in LINK_FACETS:
+            for value in list(self._postings[facet]):
+                self._set(facet, value, book_id, False)
+        _remove_id(self._all, book_id)
+
+    def update_link(self, facet, name, book_id, present):
+        with self._lock:
+            if not self._record(self._set, facet, name, book_id, present):
+                return
+            self._set(facet, name, book_id, present)
+
+    def _facet_ids(self, facet, values):
+        # Внутри фасета значения объединяются (OR)
+        postings = self._postings[facet]
+        return set().union(*(postings.get(value, ()) for value in values))
+
+    def _match(self, filters, exclude=None):
+        # Между фасетами — пересечение (AND); None означает «все книги»
+        result = None
+        for facet, values in filters.items():
+            if facet == exclude or not values:
+                continue
+            ids = self._facet_ids(facet, values)
+            result = ids if result is None else result & ids
+        return result
+
+    def filter_ids(self, filters):
+        with self._lock:
+            ids = self._match(filters)
+            return list(self._all) if ids is None else sorted(ids)
+
+    def counts(self, filters, restrict_ids=None):
+        # Счётчик значения фасета учитывает все фильтры, кроме фильтра самого фасета
+        with self._lock:
+            restrict = None if restrict_ids is None else set(restrict_ids)
+            result = {}
+            for facet in FACETS:
+                base = self._match(filters, exclude=facet)
+                if restrict is not None:
+                    base = restrict if base is None else base & restrict
+                facet_counts = {}
+                for value, ids in self._postings[facet].items():
+                    # Без ограничений счётчик — просто длина списка
+                    count = len(ids) if base is None else len(base.intersection(ids))
+                    if count:
+                        facet_counts[value] = count
+                result[facet] = sort_counts(facet_counts)
+            return result
+
+
+facet_index = FacetIndex()
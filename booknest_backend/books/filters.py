@@ -0,0 +1,53 @@
+import time
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from django.db.models import Count
+
+from .models import Book, Genre, Trope
+
+
+FILTERS_VERSION_KEY = 'books:filters:version'
+FILTER_TYPES = ('genres', 'tropes', 'countries', 'authors')
+
+
+def get_filters_version():
+    version = cache.get(FILTERS_VERSION_KEY)
+    if version is None:
+        cache.add(FILTERS_VERSION_KEY, time.time(), None)
+        version = cache.get(FILTERS_VERSION_KEY, time.time())
+    return version
+
+
+def bump_filters_version():
+    # Старые словари остаются в кэше под старой версией и просто истекают
+    cache.set(FILTERS_VERSION_KEY, time.time(), None)
+
+
+def build_vocabularies():
+    def rows(queryset):
+        return [{'name': name, 'count': count} for name, count in queryset]
+
+    return {
+        'genres': rows(Genre.objects.annotate(count=Count('bookgenre')).order_by('name').values_list('name', 'count')),
+        'tropes': rows(Trope.objects.annotate(count=Count('booktrope')).order_by('name').values_list('name', 'count')),
+        'countries': rows(Book.objects.order_by('country').values('country').annotate(count=Count('id')).values_list('country', 'count')),
+        'authors': rows(Book.objects.order_by('author').values('author').annotate(count=Count('id')).values_list('author', 'count')),
+    }
+
+
+def get_vocabularies():
+    key = f'books:filters:{get_filters_version()}'
+    vocabularies = cache.get(key)
+    if vocabularies is None:
+        vocabularies = build_vocabularies()
+        cache.set(key, vocabularies, 60 * 60)
+    return vocabularies
+
+
+def filters_etag(request, filter_type):
+    return f'filters-{get_filters_version()}-{filter_type}'
+
+
+def filters_last_modified(request, filter_type):
+    return datetime.fromtimestamp(get_filters_version(), tz=timezone.utc)
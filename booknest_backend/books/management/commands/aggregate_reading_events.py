@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from books.reading_stats import aggregate_events, ensure_partitions
+
+
+class Command(BaseCommand):
+    help = 'Aggregate the reading event log into daily stats, streaks and book completion rates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--interval', type=float, default=30.0,
+                            help='Seconds to sleep when there are no new events')
+        parser.add_argument('--once', action='store_true',
+                            help='Aggregate all pending events and exit')
+
+    def handle(self, *args, **options):
+        ensure_partitions()
+        while True:
+            processed = aggregate_events(options['batch_size'])
+            if processed:
+                self.stdout.write(f'Aggregated {processed} reading events')
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+            ensure_partitions()
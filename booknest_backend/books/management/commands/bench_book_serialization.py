@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from books.models import Book
+from books.renderers import FastJSONRenderer
+from books.serializers import BookSerializer, book_rows, serialize_book_rows
+
+
+class Command(BaseCommand):
+    help = 'Compare per-book serialization time of BookSerializer and the fast row path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        ids = list(Book.objects.order_by('id').values_list('id', flat=True)[:options['books']])
+        if not ids:
+            raise CommandError('No books to serialize')
+
+        def model_serializer():
+            data = BookSerializer(Book.objects.with_taxonomy().filter(pk__in=ids), many=True).data
+            return JSONRenderer().render(data)
+
+        def fast_path():
+            data = serialize_book_rows(book_rows(Book.objects.filter(pk__in=ids)))
+            return FastJSONRenderer().render(data)
+
+        for name, func in (('BookSerializer + JSONRenderer', model_serializer), ('rows + FastJSONRenderer', fast_path)):
+            func()
+            started = time.perf_counter()
+            for _ in range(options['repeat']):
+                func()
+            per_book = (time.perf_counter() - started) / (options['repeat'] * len(ids)) * 1e6
+            self.stdout.write(f'{name}: {per_book:.1f} us/book ({len(ids)} books, {options["repeat"]} runs)')
@@ -0,0 +1,130 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+
+from books.models import Book
+from books.pagination import KEYSET_ORDERINGS, encode_cursor, paginate_keyset
+from books.search import search_books
+
+
+# Синтетические книги: данные достаточно разнообразны, чтобы планировщик не схлопывал сортировку
+FILL_SQL = """
+INSERT INTO book (
+    title, author, description, country, year, pages, rating, rating_sum, rating_count,
+    imported_rating_sum, imported_rating_count, popularity_score, age_rating, created_date
+)
+SELECT
+    'Bench book ' || n, 'Author ' || (n %% 5000), 'Synthetic description ' || md5(n::text),
+    (ARRAY['KZ', 'RU', 'US', 'GB', 'FR'])[n %% 5 + 1], 1900 + n %% 125, 50 + n %% 900,
+    round((n %% 500) / 100.0, 2), 0, 0, 0, 0, (n %% 1000) / 10.0,
+    (ARRAY['0+', '6+', '12+', '16+', '18+'])[n %% 5 + 1], now() - n * interval '1 second'
+FROM generate_series(%s, %s) AS n
+"""
+
+PAGE_FIELDS = ('id', 'title', 'author', 'rating', 'year', 'pages', 'created_date', 'popularity_score')
+
+
+def best_time(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+class Command(BaseCommand):
+    help = 'Compare OFFSET and keyset pagination (and icontains vs full-text search) on synthetic catalogs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,100000,1000000',
+                            help='Comma-separated catalog sizes to benchmark')
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--sort', choices=sorted(KEYSET_ORDERINGS), default='created_date')
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--query', default=None,
+                            help='Also compare icontains and full-text search for this query')
+        parser.add_argument('--keep', action='store_true',
+                            help='Keep the synthetic books instead of rolling them back')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('bench_pagination requires PostgreSQL')
+        try:
+            sizes = sorted(int(size) for size in options['sizes'].split(','))
+        except ValueError:
+            raise CommandError('--sizes must be a comma-separated list of integers')
+
+        # Все синтетические книги живут в одной транзакции и по умолчанию откатываются
+        with transaction.atomic():
+            for size in sizes:
+                total = self.fill(size)
+                self.stdout.write(self.style.MIGRATE_HEADING(f'{total} books, sort={options["sort"]}'))
+                self.bench_pages(total, options)
+                if options['query']:
+                    self.bench_search(options['query'], options)
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+    def fill(self, size):
+        total = Book.objects.count()
+        if total < size:
+            started = time.perf_counter()
+            with connection.cursor() as cursor:
+                cursor.execute(FILL_SQL, [total + 1, size])
+                cursor.execute('ANALYZE book')
+            self.stdout.write(f'Inserted {size - total} synthetic books in {time.perf_counter() - started:.1f}s')
+            total = size
+        return total
+
+    def bench_pages(self, total, options):
+        page_size = options['page_size']
+        ordering = KEYSET_ORDERINGS[options['sort']]
+        books = Book.objects.order_by(*ordering).values(*PAGE_FIELDS)
+
+        for depth in (0, total // 10, total // 2, max(0, total - page_size)):
+            # Курсор keyset-страницы, начинающейся с той же строки, что и OFFSET depth
+            cursor = ''
+            if depth:
+                last = books[depth - 1]
+                cursor = encode_cursor([last[field.lstrip('-')] for field in ordering])
+
+            def offset_page():
+                # Как в BookListView без курсора: COUNT(*) плюс OFFSET
+                books.count()
+                list(books[depth:depth + page_size])
+
+            def keyset_page():
+                paginate_keyset(books, ordering, cursor, page_size)
+
+            offset_ms = best_time(offset_page, options['repeat'])
+            keyset_ms = best_time(keyset_page, options['repeat'])
+            self.stdout.write(
+                f'  page at row {depth:>9}: offset {offset_ms:9.1f} ms   keyset {keyset_ms:9.1f} ms'
+                f'   ({offset_ms / max(keyset_ms, 1e-6):.1f}x)'
+            )
+
+    def bench_search(self, query, options):
+        page_size = options['page_size']
+
+        def icontains():
+            # Прежний путь BookSearchView: три ILIKE '%q%' по всей таблице
+            books = Book.objects.filter(
+                Q(title__icontains=query) | Q(author__icontains=query) | Q(description__icontains=query)
+            ).order_by(*KEYSET_ORDERINGS['rating']).values(*PAGE_FIELDS)
+            books.count()
+            list(books[:page_size])
+
+        def full_text():
+            books = search_books(Book.objects.all(), query).order_by('-rank', 'id').values(*PAGE_FIELDS)
+            books.count()
+            list(books[:page_size])
+
+        icontains_ms = best_time(icontains, options['repeat'])
+        full_text_ms = best_time(full_text, options['repeat'])
+        self.stdout.write(
+            f'  search {query!r}: icontains {icontains_ms:9.1f} ms   full-text {full_text_ms:9.1f} ms'
+            f'   ({icontains_ms / max(full_text_ms, 1e-6):.1f}x)'
+        )
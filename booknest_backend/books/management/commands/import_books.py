@@ -0,0 +1,187 @@
+import csv
+import io
+import json
+import time
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from books.models import Book, Genre, Trope, BookGenre, BookTrope
+from books.facets import facet_index
+from books.filters import bump_filters_version
+from books.cache import invalidate_all
+
+
+BOOK_FIELDS = (
+    'title', 'author', 'description', 'country', 'year', 'pages', 'age_rating',
+    'rating', 'rating_sum', 'rating_count', 'imported_rating_sum', 'imported_rating_count',
+)
+MAX_RATING = 5
+
+
+def read_rows(path, file_format):
+    with open(path, encoding='utf-8', newline='') as f:
+        if file_format == 'jsonl':
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            # В CSV жанры и тропы перечисляются через "|"
+            for row in csv.DictReader(f):
+                row['genres'] = [name for name in (row.get('genres') or '').split('|') if name]
+                row['tropes'] = [name for name in (row.get('tropes') or '').split('|') if name]
+                yield row
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = 'Bulk import books with genres and tropes from a CSV or JSONL file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], default=None,
+                            help='Input format (default: guessed from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--method', choices=['bulk', 'copy'], default='bulk',
+                            help='bulk_create, or PostgreSQL COPY (faster for large files)')
+        parser.add_argument('--create-missing', action='store_true',
+                            help='Create genres and tropes that do not exist yet')
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or ('jsonl' if options['path'].endswith('.jsonl') else 'csv')
+        if options['method'] == 'copy' and connection.vendor != 'postgresql':
+            raise CommandError('--method copy requires PostgreSQL')
+
+        self.create_missing = options['create_missing']
+        # Имя -> id загружаем один раз, а не get_or_create на каждую строку
+        self.genre_ids = dict(Genre.objects.values_list('name', 'id'))
+        self.trope_ids = dict(Trope.objects.values_list('name', 'id'))
+        load_chunk = self.copy_chunk if options['method'] == 'copy' else self.bulk_chunk
+
+        started = time.monotonic()
+        total = 0
+        try:
+            for chunk in chunked(read_rows(options['path'], file_format), options['batch_size']):
+                with transaction.atomic():
+                    self.resolve_names(chunk)
+                    load_chunk(chunk)
+                total += len(chunk)
+                elapsed = time.monotonic() - started
+                self.stdout.write(f'{total} books imported ({total / elapsed:.0f} rows/sec)')
+        except (OSError, ValueError, KeyError, InvalidOperation) as e:
+            raise CommandError(f'Import stopped after {total} books: {e}')
+        finally:
+            # bulk_create и COPY не вызывают сигналы моделей
+            if total:
+                facet_index.invalidate()
+                bump_filters_version()
+                invalidate_all()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {total} books in {elapsed:.1f}s ({total / max(elapsed, 1e-9):.0f} rows/sec)'
+        ))
+
+    def resolve_names(self, chunk):
+        for key, model, ids in (('genres', Genre, self.genre_ids), ('tropes', Trope, self.trope_ids)):
+            names = {name for row in chunk for name in row.get(key) or []}
+            unknown = names - ids.keys()
+            if not unknown:
+                continue
+            if not self.create_missing:
+                raise ValueError(f'Unknown {key}: {", ".join(sorted(unknown))}')
+            model.objects.bulk_create([model(name=name) for name in unknown], ignore_conflicts=True)
+            ids.update(model.objects.filter(name__in=unknown).values_list('name', 'id'))
+
+    def links(self, chunk, book_ids):
+        genre_links, trope_links = [], []
+        for row, book_id in zip(chunk, book_ids):
+            genre_links.extend((book_id, self.genre_ids[name]) for name in set(row.get('genres') or []))
+            trope_links.extend((book_id, self.trope_ids[name]) for name in set(row.get('tropes') or []))
+        return genre_links, trope_links
+
+    def book_values(self, row):
+        # Импортированный рейтинг засчитываем как rating_count оценок (по умолчанию одну),
+        # иначе первый же комментарий полностью заменит его своей оценкой
+        try:
+            rating = Decimal(str(row.get('rating') or 0)).quantize(Decimal('0.01'))
+        except InvalidOperation:
+            raise ValueError(f'Invalid rating {row.get("rating")!r} for {row.get("title")!r}')
+        if not 0 <= rating <= MAX_RATING:
+            raise ValueError(f'Rating {rating} for {row.get("title")!r} is out of range 0-{MAX_RATING}')
+        rating_count = int(row.get('rating_count') or (1 if rating else 0))
+        if rating_count < 0:
+            raise ValueError(f'Invalid rating_count {rating_count} for {row.get("title")!r}')
+        rating_sum = rating * rating_count
+        return {
+            'title': row['title'],
+            'author': row['author'],
+            'description': row.get('description') or '',
+            'country': row.get('country') or '',
+            'year': int(row['year']),
+            'pages': int(row['pages']),
+            'age_rating': row.get('age_rating') or '0+',
+            'rating': rating,
+            'rating_sum': rating_sum,
+            'rating_count': rating_count,
+            'imported_rating_sum': rating_sum,
+            'imported_rating_count': rating_count,
+        }
+
+    def bulk_chunk(self, chunk):
+        books = Book.objects.bulk_create([Book(**self.book_values(row)) for row in chunk])
+        genre_links, trope_links = self.links(chunk, [book.id for book in books])
+        BookGenre.objects.bulk_create([BookGenre(book_id=b, genre_id=g) for b, g in genre_links])
+        BookTrope.objects.bulk_create([BookTrope(book_id=b, trope_id=t) for b, t in trope_links])
+
+    def copy_chunk(self, chunk):
+        now = timezone.now()
+        with connection.cursor() as cursor:
+            # id заранее берём из последовательности, чтобы сразу писать связи
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence('book', 'id')) FROM generate_series(1, %s)",
+                [len(chunk)]
+            )
+            book_ids = [row[0] for row in cursor.fetchall()]
+
+            book_rows = []
+            for book_id, row in zip(book_ids, chunk):
+                values = self.book_values(row)
+                book_rows.append(
+                    [book_id] + [values[field] for field in BOOK_FIELDS] + [now, 0.0]
+                )
+            columns = ('id',) + BOOK_FIELDS + ('created_date', 'popularity_score')
+            self.copy_rows(cursor, 'book', columns, book_rows)
+
+            genre_links, trope_links = self.links(chunk, book_ids)
+            self.copy_rows(cursor, 'book_genre', ('book_id', 'genre_id'), genre_links)
+            self.copy_rows(cursor, 'book_trope', ('book_id', 'trope_id'), trope_links)
+
+    def copy_rows(self, cursor, table, columns, rows):
+        if not rows:
+            return
+        sql = f'COPY {table} ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)'
+        raw = cursor.cursor
+        if hasattr(raw, 'copy_expert'):
+            # psycopg2
+            buffer = io.StringIO()
+            # Без кавычек пустая строка в COPY ... CSV читается как NULL
+            csv.writer(buffer, quoting=csv.QUOTE_ALL).writerows(rows)
+            buffer.seek(0)
+            raw.copy_expert(sql, buffer)
+        else:
+            # psycopg 3
+            with raw.copy(sql.replace(' WITH (FORMAT csv)', '')) as copy:
+                for row in rows:
+                    copy.write_row(row)
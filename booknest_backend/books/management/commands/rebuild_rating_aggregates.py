@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from books.models import Book
+from books.ratings import rebuild_rating_aggregates
+from books.cache import invalidate_all
+
+
+class Command(BaseCommand):
+    help = 'Recompute rating_sum, rating_count and rating for books from their comments and imported ratings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--book', type=int, action='append', dest='book_ids',
+                            help='Only rebuild the given book id (can be repeated)')
+
+    def handle(self, *args, **options):
+        queryset = Book.objects.all()
+        if options['book_ids']:
+            queryset = queryset.filter(pk__in=options['book_ids'])
+
+        updated = rebuild_rating_aggregates(queryset)
+        invalidate_all()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rating aggregates for {updated} books'))
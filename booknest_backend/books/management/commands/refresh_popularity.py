@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from books.ranking import refresh_popularity
+
+
+class Command(BaseCommand):
+    help = 'Recompute popularity_score for all books (run periodically, e.g. from cron)'
+
+    def handle(self, *args, **options):
+        updated = refresh_popularity()
+        self.stdout.write(self.style.SUCCESS(f'Refreshed popularity for {updated} books'))
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:34
+
+from django.db import migrations, models
+
+
+BACKFILL_SQL = """
+UPDATE book
+SET rating_sum = agg.rating_sum, rating_count = agg.rating_count
+FROM (
+    SELECT book_id, SUM(rating) AS rating_sum, COUNT(rating) AS rating_count
+    FROM comment
+    WHERE rating IS NOT NULL
+    GROUP BY book_id
+) AS agg
+WHERE agg.book_id = book.id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0002_book_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='rating_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='rating_sum',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+    ]
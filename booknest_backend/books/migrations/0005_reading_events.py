@@ -0,0 +1,133 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:49
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Секционированная по месяцам таблица журнала. Первичный ключ включает ключ секционирования,
+# как требует PostgreSQL. Секции на текущий и следующий месяцы создаются здесь, дальше —
+# командой aggregate_reading_events (ensure_partitions); остальное попадает в DEFAULT.
+CREATE_READING_EVENT_SQL = """
+CREATE TABLE reading_event (
+    id bigserial NOT NULL,
+    user_id integer NOT NULL REFERENCES "user" (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+    book_id bigint NOT NULL REFERENCES book (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+    page integer NOT NULL,
+    created_date timestamp with time zone NOT NULL,
+    PRIMARY KEY (id, created_date)
+) PARTITION BY RANGE (created_date);
+
+CREATE TABLE reading_event_default PARTITION OF reading_event DEFAULT;
+
+DO $$
+DECLARE
+    month_start date := date_trunc('month', now());
+BEGIN
+    FOR i IN 0..1 LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF reading_event FOR VALUES FROM (%L) TO (%L)',
+            'reading_event_' || to_char(month_start + i * interval '1 month', 'YYYY_MM'),
+            month_start + i * interval '1 month',
+            month_start + (i + 1) * interval '1 month'
+        );
+    END LOOP;
+END
+$$;
+"""
+
+DROP_READING_EVENT_SQL = 'DROP TABLE IF EXISTS reading_event CASCADE;'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_translationcache'),
+        ('books', '0004_book_popularity_score'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookReadingStats',
+            fields=[
+                ('book', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='reading_stats', serialize=False, to='books.book')),
+                ('readers', models.IntegerField(default=0)),
+                ('completed', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'book_reading_stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='ReadingAggregationState',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('last_event_id', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'reading_aggregation_state',
+            },
+        ),
+        migrations.CreateModel(
+            name='ReadingStreak',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='reading_streak', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('current_streak', models.IntegerField(default=0)),
+                ('longest_streak', models.IntegerField(default=0)),
+                ('last_read_date', models.DateField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'reading_streak',
+            },
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(CREATE_READING_EVENT_SQL, DROP_READING_EVENT_SQL),
+            ],
+            state_operations=[
+                migrations.CreateModel(
+                    name='ReadingEvent',
+                    fields=[
+                        ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                        ('page', models.IntegerField()),
+                        ('created_date', models.DateTimeField(default=django.utils.timezone.now)),
+                        ('book', models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='books.book')),
+                        ('user', models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'db_table': 'reading_event',
+                    },
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyReadingStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('pages_read', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_reading_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'reading_daily_stats',
+                'ordering': ['-date'],
+                'unique_together': {('user', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ReadingPosition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('max_page', models.IntegerField(default=0)),
+                ('completed', models.BooleanField(default=False)),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='books.book')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'reading_position',
+                'unique_together': {('user', 'book')},
+            },
+        ),
+    ]
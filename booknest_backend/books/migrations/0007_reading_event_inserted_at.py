@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:07
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0006_comment_threads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='readingevent',
+            name='inserted_at',
+            field=models.DateTimeField(db_default=django.db.models.functions.datetime.Now(), editable=False),
+        ),
+    ]
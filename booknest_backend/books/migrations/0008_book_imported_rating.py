@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0007_reading_event_inserted_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='imported_rating_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='imported_rating_sum',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='book',
+            name='rating_sum',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+    ]
@@ -1,6 +1,40 @@
 from django.db import models
+from django.db.models.functions import Now
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+
+
+def taxonomy_prefetches(prefix=''):
+    # Жанры и тропы с их названиями за два запроса, независимо от числа книг
+    return [
+        models.Prefetch(f'{prefix}book_genres', queryset=BookGenre.objects.select_related('genre')),
+        models.Prefetch(f'{prefix}book_tropes', queryset=BookTrope.objects.select_related('trope')),
+    ]
+
+
+class BookQuerySet(models.QuerySet):
+    def with_taxonomy(self):
+        return self.prefetch_related(*taxonomy_prefetches())
+
+
+class ChartQuerySet(models.QuerySet):
+    def with_books(self):
+        return self.prefetch_related(models.Prefetch(
+            'chart_books',
+            queryset=ChartBook.objects.select_related('book').prefetch_related(*taxonomy_prefetches('book__'))
+        ))
+
+
+class BookCollectionQuerySet(models.QuerySet):
+    def with_books(self):
+        return self.prefetch_related(models.Prefetch(
+            'collection_books',
+            queryset=CollectionBook.objects.select_related('book').prefetch_related(*taxonomy_prefetches('book__'))
+        ))
+
 
 class Book(models.Model):
     title = models.CharField(max_length=255)
@@ -11,6 +45,14 @@ class Book(models.Model):
     year = models.IntegerField()
     pages = models.IntegerField()
     rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.00)
+    # Сумма и количество всех оценок; rating = rating_sum / rating_count
+    rating_sum = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    rating_count = models.IntegerField(default=0)
+    # Часть из них пришла с импортом каталога, а не из комментариев: пересчёт агрегатов её сохраняет
+    imported_rating_sum = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    imported_rating_count = models.IntegerField(default=0)
+    # Байесовский рейтинг с затуханием активности, см. books/ranking.py
+    popularity_score = models.FloatField(default=0.0, db_index=True)
     age_rating = models.CharField(max_length=10, choices=[
         ('0+', '0+'),
         ('6+', '6+'),
@@ -19,10 +61,19 @@ class Book(models.Model):
         ('18+', '18+')
     ])
     created_date = models.DateTimeField(auto_now_add=True)
+    # Заполняется триггером в БД: title (A) > author (B) > description (C)
+    search_vector = SearchVectorField(null=True, editable=False)
+    
+    objects = BookQuerySet.as_manager()
     
     class Meta:
         db_table = 'book'
         ordering = ['-created_date']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='book_search_vector_gin'),
+            GinIndex(fields=['title'], name='book_title_trgm', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['author'], name='book_author_trgm', opclasses=['gin_trgm_ops']),
+        ]
     
     def __str__(self):
         return self.title
@@ -110,6 +161,8 @@ class Chart(models.Model):
     is_public = models.BooleanField(default=False)
     created_date = models.DateTimeField(auto_now_add=True)
     
+    objects = ChartQuerySet.as_manager()
+    
     class Meta:
         db_table = 'chart'
         ordering = ['-created_date']
@@ -136,17 +189,25 @@ class ChartBook(models.Model):
 class Comment(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='comments')
     book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='comments')
+    # Ответ на комментарий верхнего уровня; у ответов нет оценки
+    parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='replies')
     comment = models.TextField()
     rating = models.IntegerField(
         validators=[MinValueValidator(1), MaxValueValidator(5)],
         blank=True,
         null=True
     )
+    # Счётчик ответов, обновляется сигналами
+    reply_count = models.IntegerField(default=0)
     created_date = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         db_table = 'comment'
         ordering = ['-created_date']
+        indexes = [
+            models.Index(fields=['book', 'created_date'], name='comment_book_created_idx'),
+            models.Index(fields=['parent', 'created_date'], name='comment_parent_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.book.title}"
@@ -158,6 +219,8 @@ class BookCollection(models.Model):
     image = models.ImageField(upload_to='collection_images/', blank=True, null=True)
     created_date = models.DateTimeField(auto_now_add=True)
     
+    objects = BookCollectionQuerySet.as_manager()
+    
     class Meta:
         db_table = 'book_collection'
         ordering = ['-created_date']
@@ -174,4 +237,85 @@ class CollectionBook(models.Model):
     class Meta:
         db_table = 'collection_book'
         unique_together = ('collection', 'book')
-        ordering = ['order']
\ No newline at end of file
+        ordering = ['order']
+
+
+class ReadingEvent(models.Model):
+    # Журнал чтения только на добавление. В PostgreSQL таблица секционирована по месяцам
+    # created_date (см. миграцию 0005). Каскадное удаление делает сама БД (ON DELETE CASCADE),
+    # чтобы Django не перебирал все секции при удалении пользователя или книги.
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, related_name='+')
+    book = models.ForeignKey(Book, on_delete=models.DO_NOTHING, related_name='+')
+    page = models.IntegerField()
+    created_date = models.DateTimeField(default=timezone.now)
+    # Время вставки в БД: created_date у буферизованных событий — время чтения, а не записи
+    inserted_at = models.DateTimeField(db_default=Now(), editable=False)
+    
+    class Meta:
+        db_table = 'reading_event'
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.book_id} - Page {self.page}"
+
+
+# Сводные таблицы, которые пополняет aggregate_reading_events (books/reading_stats.py).
+# Эндпоинты статистики читают только их, а не сырые события.
+
+class ReadingPosition(models.Model):
+    # Самая дальняя страница пользователя в книге: из разницы считаются прочитанные страницы
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='+')
+    max_page = models.IntegerField(default=0)
+    completed = models.BooleanField(default=False)
+    
+    class Meta:
+        db_table = 'reading_position'
+        unique_together = ('user', 'book')
+
+
+class DailyReadingStats(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='daily_reading_stats')
+    date = models.DateField()
+    pages_read = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'reading_daily_stats'
+        unique_together = ('user', 'date')
+        ordering = ['-date']
+
+
+class ReadingStreak(models.Model):
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='reading_streak'
+    )
+    current_streak = models.IntegerField(default=0)
+    longest_streak = models.IntegerField(default=0)
+    last_read_date = models.DateField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'reading_streak'
+
+
+class BookReadingStats(models.Model):
+    book = models.OneToOneField(Book, on_delete=models.CASCADE, primary_key=True, related_name='reading_stats')
+    readers = models.IntegerField(default=0)
+    completed = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'book_reading_stats'
+    
+    @property
+    def completion_rate(self):
+        if self.readers > 0:
+            return round(self.completed / self.readers, 4)
+        return 0
+
+
+class ReadingAggregationState(models.Model):
+    # Последнее обработанное событие журнала
+    name = models.CharField(max_length=50, primary_key=True)
+    last_event_id = models.BigIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'reading_aggregation_state'
@@ -0,0 +1,117 @@
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import connection
+from django.db.models import Q
+
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Порядок сортировки для keyset-пагинации; id в конце делает ключ уникальным
+KEYSET_ORDERINGS = {
+    'rating': ('-rating', 'id'),
+    'popular': ('-popularity_score', 'id'),
+    'title': ('title', 'id'),
+    'year': ('-year', 'id'),
+    'pages': ('-pages', 'id'),
+    'created_date': ('-created_date', 'id'),
+}
+
+# Комментарии: новые сверху, ответы внутри ветки — по порядку
+COMMENT_ORDERING = ('-created_date', '-id')
+REPLY_ORDERING = ('created_date', 'id')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def get_page_size(request):
+    try:
+        page_size = int(request.GET.get('page_size', DEFAULT_PAGE_SIZE))
+    except (TypeError, ValueError):
+        page_size = DEFAULT_PAGE_SIZE
+    return max(1, min(page_size, MAX_PAGE_SIZE))
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, default=str, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def cursor_value(model, name, value):
+    # Значение из курсора приводится к типу поля сортировки, иначе ошибка дойдёт до БД
+    if value is None:
+        raise InvalidCursor('Invalid cursor')
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        # Аннотации (rank полнотекстового поиска) — числа с плавающей точкой
+        field = None
+    try:
+        if field is None:
+            return float(value)
+        if field.primary_key:
+            value = int(value)
+        value = field.to_python(value)
+        field.run_validators(value)
+        return value
+    except (ValidationError, TypeError, ValueError, ArithmeticError):
+        raise InvalidCursor('Invalid cursor')
+
+
+def decode_cursor(token, ordering, model):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise InvalidCursor('Invalid cursor')
+    return [cursor_value(model, field.lstrip('-'), value) for field, value in zip(ordering, values)]
+
+
+def keyset_filter(ordering, values):
+    # (a, b) после (x, y): a после x, либо a = x и b после y
+    condition = Q()
+    equal = Q()
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= equal & Q(**{f'{name}__{lookup}': value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+def paginate_keyset(queryset, ordering, cursor, page_size):
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        queryset = queryset.filter(keyset_filter(ordering, decode_cursor(cursor, ordering, queryset.model)))
+
+    rows = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        if isinstance(last, dict):
+            values = [last[field.lstrip('-')] for field in ordering]
+        else:
+            values = [getattr(last, field.lstrip('-')) for field in ordering]
+        next_cursor = encode_cursor(values)
+    return rows, next_cursor
+
+
+def estimate_count(queryset):
+    # Для нефильтрованной таблицы в PostgreSQL берём оценку планировщика вместо COUNT(*)
+    if connection.vendor == 'postgresql' and not queryset.query.has_filters():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        if row and row[0] > 0:
+            return row[0]
+    return queryset.count()
@@ -0,0 +1,175 @@
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Book, ReadingProgress
+from . import cache
+from .reading_stats import record_events
+
+
+logger = logging.getLogger('books.progress')
+
+
+def is_enabled():
+    return getattr(settings, 'READING_PROGRESS_BUFFER', False)
+
+
+class ProgressBuffer:
+    # Буфер прогресса чтения: частые обновления одной пары (user, book) схлопываются
+    # в одну запись и пишутся пачкой через bulk_update / bulk_create.
+    # Фоновый поток сбрасывает буфер не реже раза в flush_interval, даже если
+    # новых обновлений не приходит.
+
+    def __init__(self, max_entries=500, flush_interval=5):
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._flushed_at = time.monotonic()
+        self._flusher = None
+        self._stopped = threading.Event()
+
+    def _start_flusher(self):
+        # Поток запускается при первом обновлении, то есть уже в процессе воркера, а не до fork
+        if self._flusher is None or not self._flusher.is_alive():
+            self._stopped.clear()
+            self._flusher = threading.Thread(target=self._flush_periodically, name='progress-flush', daemon=True)
+            self._flusher.start()
+
+    def _flush_periodically(self):
+        try:
+            while True:
+                with self._lock:
+                    wait = self.flush_interval - (time.monotonic() - self._flushed_at)
+                if self._stopped.wait(max(wait, 0)):
+                    return
+                with self._lock:
+                    due = self._pending and time.monotonic() - self._flushed_at >= self.flush_interval
+                    if not self._pending:
+                        # Пустой буфер: следующий срок отсчитываем от сейчас
+                        self._flushed_at = time.monotonic()
+                if due:
+                    try:
+                        self.flush()
+                    except Exception:
+                        # Обновления вернулись в буфер, попробуем через flush_interval
+                        logger.exception('reading progress flush failed')
+        finally:
+            connections.close_all()
+
+    def stop(self):
+        # При выходе процесса: останавливаем поток и записываем остаток буфера
+        self._stopped.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        return self.flush()
+
+    def add(self, user_id, book_id, current_page):
+        with self._lock:
+            self._start_flusher()
+            self._pending[(user_id, book_id)] = (current_page, timezone.now())
+            due = (
+                len(self._pending) >= self.max_entries
+                or time.monotonic() - self._flushed_at >= self.flush_interval
+            )
+        # Кэш пользователя сбрасываем сразу, чтобы новый прогресс был виден до записи в БД
+        cache.invalidate_user(user_id)
+        if due:
+            self.flush()
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush_user(self, user_id):
+        # Перед чтением прогресса пользователя записываем его незаписанные обновления
+        with self._lock:
+            entries = {key: value for key, value in self._pending.items() if key[0] == user_id}
+            for key in entries:
+                del self._pending[key]
+        if entries:
+            self._write_or_restore(entries)
+
+    def flush(self):
+        with self._lock:
+            entries, self._pending = self._pending, {}
+            self._flushed_at = time.monotonic()
+        if entries:
+            self._write_or_restore(entries)
+        return len(entries)
+
+    def _write_or_restore(self, entries):
+        try:
+            self._write(entries)
+        except Exception:
+            # Возвращаем обновления в буфер, если за это время не пришли более новые
+            with self._lock:
+                for key, value in entries.items():
+                    self._pending.setdefault(key, value)
+            raise
+
+    def _write(self, entries):
+        # Удалённые книги или неверные id просто отбрасываем
+        existing_books = set(Book.objects.filter(
+            id__in={book_id for _, book_id in entries}
+        ).values_list('id', flat=True))
+        entries = {key: value for key, value in entries.items() if key[1] in existing_books}
+        if not entries:
+            return
+
+        # Текущей становится книга с самым поздним обновлением пользователя
+        current = {}
+        for (user_id, book_id), (_, read_at) in entries.items():
+            if user_id not in current or read_at > entries[(user_id, current[user_id])][1]:
+                current[user_id] = book_id
+
+        with transaction.atomic():
+            # Нужны только строки из буфера и прежние текущие строки этих пользователей
+            rows = ReadingProgress.objects.select_for_update().filter(
+                Q(is_current=True) | Q(book_id__in=existing_books), user_id__in=current
+            )
+            rows = {(row.user_id, row.book_id): row for row in rows}
+
+            changed = []
+            for key, row in rows.items():
+                if key in entries:
+                    row.current_page, row.last_read = entries[key]
+                    row.is_current = current[row.user_id] == row.book_id
+                    changed.append(row)
+                elif row.is_current and current.get(row.user_id) != row.book_id:
+                    row.is_current = False
+                    changed.append(row)
+            ReadingProgress.objects.bulk_update(changed, ['current_page', 'last_read', 'is_current'])
+
+            ReadingProgress.objects.bulk_create([
+                ReadingProgress(
+                    user_id=user_id, book_id=book_id, current_page=page,
+                    last_read=read_at, is_current=current[user_id] == book_id
+                )
+                for (user_id, book_id), (page, read_at) in entries.items()
+                if (user_id, book_id) not in rows
+            ], update_conflicts=True, unique_fields=['user', 'book'],
+                update_fields=['current_page', 'last_read', 'is_current'])
+
+            # В журнал попадает одно событие на схлопнутую пару (user, book)
+            record_events([
+                (user_id, book_id, page, read_at) for (user_id, book_id), (page, read_at) in entries.items()
+            ])
+
+        # bulk_update и bulk_create не вызывают сигналы моделей
+        for user_id in current:
+            cache.invalidate_user(user_id)
+
+
+progress_buffer = ProgressBuffer(
+    max_entries=getattr(settings, 'READING_PROGRESS_BUFFER_SIZE', 500),
+    flush_interval=getattr(settings, 'READING_PROGRESS_FLUSH_INTERVAL', 5),
+)
+atexit.register(progress_buffer.stop)
@@ -0,0 +1,52 @@
+import math
+
+from django.core.cache import cache
+from django.db.models import DurationField, ExpressionWrapper, F, FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, Exp, Extract, Ln, Now
+
+from .models import Book, Comment, FavoriteBook
+
+
+# Сколько "виртуальных" оценок со средним по каталогу добавляется к каждой книге
+PRIOR_WEIGHT = 10
+# Через сколько дней комментарий или добавление в избранное весит вдвое меньше
+HALF_LIFE_DAYS = 30
+ACTIVITY_WEIGHT = 0.5
+
+GLOBAL_MEAN_KEY = 'books:ranking:global_mean'
+
+
+def get_global_mean():
+    mean = cache.get(GLOBAL_MEAN_KEY)
+    if mean is None:
+        totals = Book.objects.aggregate(total=Sum('rating_sum'), count=Sum('rating_count'))
+        mean = float(totals['total']) / totals['count'] if totals['count'] else 0.0
+        cache.set(GLOBAL_MEAN_KEY, mean, 60 * 60)
+    return mean
+
+
+def _decayed_activity(queryset, date_field):
+    # Сумма exp(-возраст * ln2 / полураспад) по всем событиям книги
+    age = ExpressionWrapper(Now() - F(date_field), output_field=DurationField())
+    decay = Exp(-Extract(age, 'epoch') * (math.log(2) / (HALF_LIFE_DAYS * 86400)), output_field=FloatField())
+    events = queryset.filter(book=OuterRef('pk')).order_by().values('book')
+    return Coalesce(Subquery(events.annotate(total=Sum(decay)).values('total')), Value(0.0))
+
+
+def popularity_expression(global_mean):
+    bayesian = (
+        (Cast(F('rating_sum'), FloatField()) + PRIOR_WEIGHT * global_mean) /
+        (Cast(F('rating_count'), FloatField()) + PRIOR_WEIGHT)
+    )
+    activity = (
+        _decayed_activity(Comment.objects.all(), 'created_date') +
+        _decayed_activity(FavoriteBook.objects.all(), 'added_date')
+    )
+    return bayesian + ACTIVITY_WEIGHT * Ln(activity + 1.0)
+
+
+def refresh_popularity(queryset=None):
+    if queryset is None:
+        cache.delete(GLOBAL_MEAN_KEY)
+        queryset = Book.objects.all()
+    return queryset.update(popularity_score=popularity_expression(get_global_mean()))
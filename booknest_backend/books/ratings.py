@@ -0,0 +1,50 @@
+from decimal import Decimal
+
+from django.db.models import Case, Count, DecimalField, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, Round
+
+from .models import Book, Comment
+
+
+def _average(rating_sum, rating_count):
+    return Round(
+        Cast(rating_sum, DecimalField(max_digits=12, decimal_places=4)) / rating_count,
+        2,
+        output_field=DecimalField(max_digits=3, decimal_places=2)
+    )
+
+
+def apply_rating_delta(book_id, sum_delta, count_delta):
+    # Один UPDATE: в SET все ссылки на колонки видят значения до обновления
+    new_sum = F('rating_sum') + sum_delta
+    new_count = F('rating_count') + count_delta
+    Book.objects.filter(pk=book_id).update(
+        rating_sum=new_sum,
+        rating_count=new_count,
+        rating=Case(
+            # Удалена последняя оценка — рейтинга больше нет
+            When(rating_count__lte=-count_delta, then=Value(Decimal('0.00'))),
+            default=_average(new_sum, new_count),
+        )
+    )
+
+
+def rebuild_rating_aggregates(queryset=None):
+    if queryset is None:
+        queryset = Book.objects.all()
+
+    rated = Comment.objects.filter(book=OuterRef('pk'), rating__isnull=False).order_by().values('book')
+    updated = queryset.update(
+        rating_sum=F('imported_rating_sum') + Coalesce(
+            Subquery(rated.annotate(total=Sum('rating')).values('total')), Value(0)
+        ),
+        rating_count=F('imported_rating_count') + Coalesce(
+            Subquery(rated.annotate(total=Count('id')).values('total')), Value(0)
+        ),
+    )
+    # Как и в apply_rating_delta: без оценок рейтинг 0
+    queryset.update(rating=Case(
+        When(rating_count__gt=0, then=_average(F('rating_sum'), F('rating_count'))),
+        default=Value(Decimal('0.00')),
+    ))
+    return updated
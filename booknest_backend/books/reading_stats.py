@@ -0,0 +1,214 @@
+import logging
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import (
+    Book, ReadingEvent, ReadingPosition, DailyReadingStats, ReadingStreak,
+    BookReadingStats, ReadingAggregationState
+)
+
+
+STATE_NAME = 'reading_events'
+# События моложе этой задержки не берём: транзакция с меньшим id могла ещё не закоммититься
+COMMIT_LAG = timedelta(seconds=60)
+PARTITION_MONTHS_AHEAD = 2
+_partitions_month = None
+
+logger = logging.getLogger('books.reading_stats')
+
+
+def _month_start(day, offset=0):
+    month = day.month - 1 + offset
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def ensure_partitions(months_ahead=PARTITION_MONTHS_AHEAD):
+    # Секции создаём заранее, чтобы новые события не копились в DEFAULT
+    if connection.vendor != 'postgresql':
+        return
+    today = timezone.now().date()
+    for offset in range(months_ahead + 1):
+        start, end = _month_start(today, offset), _month_start(today, offset + 1)
+        # Каждая секция в своей транзакции (или savepoint): ошибка одной не откатывает остальные
+        with transaction.atomic(), connection.cursor() as cursor:
+            _create_partition(cursor, f'reading_event_{start:%Y_%m}', start, end)
+
+
+def _create_partition(cursor, name, start, end):
+    cursor.execute('SELECT to_regclass(%s)', [name])
+    if cursor.fetchone()[0] is not None:
+        return
+    # Если событий месяца уже накопилось в DEFAULT, PostgreSQL не даст создать секцию:
+    # переносим их во временную таблицу и после создания секции вставляем обратно
+    cursor.execute('CREATE TEMP TABLE reading_event_moved (LIKE reading_event)')
+    cursor.execute(
+        'WITH moved AS (DELETE FROM reading_event_default WHERE created_date >= %s AND created_date < %s RETURNING *) '
+        'INSERT INTO reading_event_moved SELECT * FROM moved',
+        [start, end]
+    )
+    cursor.execute(
+        f'CREATE TABLE IF NOT EXISTS {name} PARTITION OF reading_event FOR VALUES FROM (%s) TO (%s)',
+        [start, end]
+    )
+    cursor.execute('INSERT INTO reading_event SELECT * FROM reading_event_moved')
+    cursor.execute('DROP TABLE reading_event_moved')
+
+
+def partitions_migrated(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    # После migrate секции появляются даже там, где агрегатор не запущен
+    if using != DEFAULT_DB_ALIAS or 'reading_event' not in connection.introspection.table_names():
+        return
+    ensure_partitions()
+
+
+def _ensure_current_partitions():
+    # Раз в месяц на процесс: запись событий тоже создаёт секции, если агрегатор давно не запускался
+    global _partitions_month
+    month = _month_start(timezone.now().date())
+    if _partitions_month == month:
+        return
+    try:
+        ensure_partitions()
+    except DatabaseError:
+        # Без секции события просто попадут в DEFAULT
+        logger.exception('reading event partitions were not created')
+    _partitions_month = month
+
+
+def record_events(events):
+    # events: (user_id, book_id, page, created_date)
+    _ensure_current_partitions()
+    ReadingEvent.objects.bulk_create([
+        ReadingEvent(user_id=user_id, book_id=book_id, page=page, created_date=created_date)
+        for user_id, book_id, page, created_date in events
+    ])
+
+
+def aggregate_events(batch_size=1000):
+    # Инкрементальная агрегация: события после сохранённого id разносятся по сводным таблицам
+    with transaction.atomic():
+        state, _ = ReadingAggregationState.objects.select_for_update().get_or_create(name=STATE_NAME)
+        rows = ReadingEvent.objects.filter(id__gt=state.last_event_id).order_by('id').values_list(
+            'id', 'user_id', 'book_id', 'page', 'created_date', 'inserted_at'
+        )[:batch_size]
+        # Берём события по порядку id до первого слишком свежего: водяной знак не должен
+        # перескочить через событие, которое ещё могут закоммитить или которое мы отложили.
+        # Смотрим на время вставки, а не на created_date — у буферизованных событий оно в прошлом.
+        cutoff = timezone.now() - COMMIT_LAG
+        events = []
+        for row in rows:
+            if row[5] >= cutoff:
+                break
+            events.append(row[:5])
+        if not events:
+            return 0
+
+        users = {event[1] for event in events}
+        books = {event[2] for event in events}
+        book_pages = dict(Book.objects.filter(id__in=books).values_list('id', 'pages'))
+        positions = {
+            (position.user_id, position.book_id): position
+            for position in ReadingPosition.objects.filter(user_id__in=users, book_id__in=books)
+        }
+
+        new_positions = {}
+        touched = set()
+        pages_by_day = Counter()
+        new_readers = Counter()
+        new_completions = Counter()
+        for _, user_id, book_id, page, created_date in events:
+            key = (user_id, book_id)
+            touched.add(key)
+            position = positions.get(key)
+            if position is None:
+                position = positions[key] = new_positions[key] = ReadingPosition(user_id=user_id, book_id=book_id)
+                new_readers[book_id] += 1
+
+            # Засчитываем только продвижение вперёд: возврат к началу не добавляет страниц
+            pages_by_day[(user_id, timezone.localdate(created_date))] += max(0, page - position.max_page)
+            position.max_page = max(position.max_page, page)
+
+            pages = book_pages.get(book_id, 0)
+            if not position.completed and pages > 0 and position.max_page >= pages:
+                position.completed = True
+                new_completions[book_id] += 1
+
+        ReadingPosition.objects.bulk_create(new_positions.values())
+        ReadingPosition.objects.bulk_update(
+            [positions[key] for key in touched if key not in new_positions],
+            ['max_page', 'completed']
+        )
+
+        _update_daily_stats(pages_by_day)
+        _update_streaks(users, pages_by_day)
+        _update_book_stats(new_readers, new_completions)
+
+        state.last_event_id = events[-1][0]
+        state.save(update_fields=['last_event_id'])
+    return len(events)
+
+
+def _update_daily_stats(pages_by_day):
+    days = {day for _, day in pages_by_day}
+    existing = {
+        (row.user_id, row.date): row
+        for row in DailyReadingStats.objects.filter(user_id__in={user_id for user_id, _ in pages_by_day}, date__in=days)
+    }
+    for key, pages in pages_by_day.items():
+        if key in existing:
+            existing[key].pages_read += pages
+    DailyReadingStats.objects.bulk_update(existing.values(), ['pages_read'])
+    DailyReadingStats.objects.bulk_create([
+        DailyReadingStats(user_id=user_id, date=day, pages_read=pages)
+        for (user_id, day), pages in pages_by_day.items()
+        if (user_id, day) not in existing
+    ])
+
+
+def _update_streaks(users, pages_by_day):
+    days_by_user = defaultdict(set)
+    for user_id, day in pages_by_day:
+        days_by_user[user_id].add(day)
+
+    streaks = {streak.user_id: streak for streak in ReadingStreak.objects.filter(user_id__in=users)}
+    new_streaks = []
+    for user_id in users:
+        streak = streaks.get(user_id)
+        if streak is None:
+            streak = ReadingStreak(user_id=user_id)
+            new_streaks.append(streak)
+        for day in sorted(days_by_user[user_id]):
+            if streak.last_read_date is not None and day <= streak.last_read_date:
+                continue
+            if streak.last_read_date == day - timedelta(days=1):
+                streak.current_streak += 1
+            else:
+                streak.current_streak = 1
+            streak.longest_streak = max(streak.longest_streak, streak.current_streak)
+            streak.last_read_date = day
+    ReadingStreak.objects.bulk_create(new_streaks)
+    ReadingStreak.objects.bulk_update(streaks.values(), ['current_streak', 'longest_streak', 'last_read_date'])
+
+
+def _update_book_stats(new_readers, new_completions):
+    books = set(new_readers) | set(new_completions)
+    BookReadingStats.objects.bulk_create([BookReadingStats(book_id=book_id) for book_id in books], ignore_conflicts=True)
+    for book_id in books:
+        BookReadingStats.objects.filter(book_id=book_id).update(
+            readers=F('readers') + new_readers[book_id],
+            completed=F('completed') + new_completions[book_id]
+        )
+
+
+def current_streak(streak, today=None):
+    # Серия прерывается, если вчера и сегодня пользователь не читал
+    if streak is None or streak.last_read_date is None:
+        return 0
+    today = today or timezone.localdate()
+    if streak.last_read_date < today - timedelta(days=1):
+        return 0
+    return streak.current_streak
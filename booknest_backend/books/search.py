@@ -0,0 +1,36 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import connection
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import Cast, Greatest
+
+
+# Должен совпадать с конфигурацией в триггере book_search_vector_update
+SEARCH_CONFIG = 'simple'
+
+
+# Фильтрует книги по запросу и добавляет аннотацию rank для sort_by=relevance
+def search_books(queryset, query):
+    if connection.vendor != 'postgresql':
+        return queryset.filter(
+            Q(title__icontains=query) |
+            Q(author__icontains=query) |
+            Q(description__icontains=query)
+        ).annotate(rank=Value(1.0, output_field=FloatField()))
+
+    search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+    matches = queryset.filter(search_vector=search_query).annotate(
+        # real -> double precision, чтобы значение точно переживало курсор пагинации
+        rank=Cast(SearchRank(F('search_vector'), search_query), FloatField())
+    )
+    if matches.exists():
+        return matches
+
+    # Ничего не нашли — пробуем нечёткий поиск по названию и автору (опечатки)
+    return queryset.filter(
+        Q(title__trigram_similar=query) | Q(author__trigram_similar=query)
+    ).annotate(
+        rank=Cast(
+            Greatest(TrigramSimilarity('title', query), TrigramSimilarity('author', query)),
+            FloatField()
+        )
+    )
@@ -1,9 +1,9 @@
 from rest_framework import serializers
+from django.core.files.storage import default_storage
 from .models import (
-    Book, Genre, Trope, FavoriteBook, ReadingProgress, 
+    Book, Genre, Trope, BookGenre, BookTrope, FavoriteBook, ReadingProgress, 
     Chart, ChartBook, Comment, BookCollection, CollectionBook
 )
-from accounts.serializers import UserSerializer
 
 
 class GenreSerializer(serializers.ModelSerializer):
@@ -30,6 +30,14 @@ class BookSerializer(serializers.ModelSerializer):
             'rating', 'age_rating', 'created_date'
         ]
     
+    def __init__(self, *args, **kwargs):
+        # fields=[...] оставляет только выбранные поля (см. get_book_fields)
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+    
     def get_genre(self, obj):
         return [bg.genre.name for bg in obj.book_genres.all()]
     
@@ -74,7 +82,7 @@ class ChartBookSerializer(serializers.ModelSerializer):
 
 class ChartSerializer(serializers.ModelSerializer):
     books = serializers.SerializerMethodField()
-    user_id = serializers.IntegerField(source='user.id', read_only=True)
+    user_id = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = Chart
@@ -85,17 +93,18 @@ class ChartSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_date']
     
     def get_books(self, obj):
-        chart_books = obj.chart_books.select_related('book').all()
-        return [BookSerializer(cb.book).data for cb in chart_books]
+        # Использует Chart.objects.with_books(), если книги уже загружены
+        return BookSerializer([cb.book for cb in obj.chart_books.all()], many=True).data
 
 
 class CommentSerializer(serializers.ModelSerializer):
     user = serializers.SerializerMethodField()
+    parent_id = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = Comment
-        fields = ['id', 'user', 'comment', 'rating', 'created_date']
-        read_only_fields = ['created_date']
+        fields = ['id', 'user', 'parent_id', 'comment', 'rating', 'reply_count', 'created_date']
+        read_only_fields = ['reply_count', 'created_date']
     
     def get_user(self, obj):
         return {
@@ -120,5 +129,100 @@ class BookCollectionSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'description', 'image', 'books', 'created_date']
     
     def get_books(self, obj):
-        collection_books = obj.collection_books.select_related('book').all()
-        return [BookSerializer(cb.book).data for cb in collection_books]
\ No newline at end of file
+        # Использует BookCollection.objects.with_books(), если книги уже загружены
+        return BookSerializer([cb.book for cb in obj.collection_books.all()], many=True).data
+
+# Разреженные наборы полей: ?fields=id,title,cover или ?view=card|full.
+# card — представление для сеток, без description (самое большое поле).
+BOOK_FIELDS = BookSerializer.Meta.fields
+BOOK_VIEWS = {
+    'full': BOOK_FIELDS,
+    'card': [field for field in BOOK_FIELDS if field != 'description'],
+}
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def get_book_fields(request, default='full'):
+    if request.GET.get('fields'):
+        fields = [field.strip() for field in request.GET['fields'].split(',') if field.strip()]
+        unknown = [field for field in fields if field not in BOOK_FIELDS]
+        if unknown:
+            raise InvalidFields(f'Unknown fields: {", ".join(unknown)}')
+        # Порядок полей в ответе всегда как в BookSerializer, id обязателен
+        return [field for field in BOOK_FIELDS if field == 'id' or field in fields]
+    view = request.GET.get('view', default)
+    if view not in BOOK_VIEWS:
+        raise InvalidFields(f'Unknown view: {view}')
+    return BOOK_VIEWS[view]
+
+
+def book_columns(fields):
+    # Столбцы таблицы book для .only()/.values(): genre и tropes берутся из связей
+    return [field for field in BOOK_ROW_FIELDS if field == 'id' or field in fields]
+
+
+def with_book_fields(queryset, fields):
+    # Для BookSerializer: не читаем лишние столбцы и не подгружаем ненужные связи
+    queryset = queryset.only(*book_columns(fields))
+    if 'genre' not in fields and 'tropes' not in fields:
+        queryset = queryset.prefetch_related(None)
+    return queryset
+
+
+# Быстрый read-only путь для списков книг: словари из .values() вместо ModelSerializer.
+# Формат ответа совпадает с BookSerializer.
+BOOK_ROW_FIELDS = [
+    'id', 'title', 'author', 'cover', 'description', 'country',
+    'year', 'pages', 'rating', 'age_rating', 'created_date'
+]
+
+_rating_field = serializers.DecimalField(max_digits=3, decimal_places=2)
+_created_date_field = serializers.DateTimeField()
+
+_ROW_CONVERTERS = {
+    'cover': lambda value: default_storage.url(value) if value else None,
+    'rating': _rating_field.to_representation,
+    'created_date': _created_date_field.to_representation,
+}
+
+
+def book_values(queryset, ordering=(), fields=BOOK_FIELDS):
+    # Аннотации из fields (например is_favorite) читаются вместе со столбцами
+    columns = book_columns(fields) + [field for field in fields if field in queryset.query.annotations]
+    # Поля сортировки (например rank) нужны в строке для курсора keyset-пагинации
+    extra = [field.lstrip('-') for field in ordering if field.lstrip('-') not in columns]
+    return queryset.prefetch_related(None).values(*columns, *extra)
+
+
+def book_rows(queryset, fields=BOOK_FIELDS):
+    return list(book_values(queryset, fields=fields))
+
+
+def serialize_book_rows(rows, fields=BOOK_FIELDS):
+    ids = [row['id'] for row in rows]
+    genres = {book_id: [] for book_id in ids}
+    tropes = {book_id: [] for book_id in ids}
+    if ids and 'genre' in fields:
+        for book_id, name in BookGenre.objects.filter(book_id__in=ids).order_by('id').values_list('book_id', 'genre__name'):
+            genres[book_id].append(name)
+    if ids and 'tropes' in fields:
+        for book_id, name in BookTrope.objects.filter(book_id__in=ids).order_by('id').values_list('book_id', 'trope__name'):
+            tropes[book_id].append(name)
+
+    result = []
+    for row in rows:
+        item = {}
+        for field in fields:
+            if field == 'genre':
+                item[field] = genres[row['id']]
+            elif field == 'tropes':
+                item[field] = tropes[row['id']]
+            elif field in _ROW_CONVERTERS:
+                item[field] = _ROW_CONVERTERS[field](row[field])
+            else:
+                item[field] = row[field]
+        result.append(item)
+    return result
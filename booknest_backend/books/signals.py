@@ -0,0 +1,152 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.db.models import F
+from django.dispatch import receiver
+
+from .models import (
+    Book, Genre, Trope, BookGenre, BookTrope, Comment, FavoriteBook,
+    ReadingProgress, Chart, ChartBook, BookCollection, CollectionBook
+)
+from . import cache
+from .facets import facet_index
+from .filters import bump_filters_version
+from .ratings import apply_rating_delta
+from .ranking import refresh_popularity
+
+
+def invalidate_book_readers(book_id):
+    # Пользователи, в чьих личных ответах (избранное, текущая книга, подборки) есть книга
+    readers = FavoriteBook.objects.filter(book_id=book_id).order_by().values_list('user_id', flat=True).union(
+        ReadingProgress.objects.filter(book_id=book_id, is_current=True).order_by().values_list('user_id', flat=True),
+        ChartBook.objects.filter(book_id=book_id).order_by().values_list('chart__user_id', flat=True),
+    )
+    cache.invalidate_users(readers)
+
+
+@receiver(post_save, sender=Book)
+def book_saved(sender, instance, **kwargs):
+    facet_index.update_book(instance)
+    bump_filters_version()
+    cache.invalidate(f'book:{instance.id}', 'book-lists')
+    invalidate_book_readers(instance.id)
+
+
+@receiver(post_delete, sender=Book)
+def book_deleted(sender, instance, **kwargs):
+    facet_index.remove_book(instance.id)
+    bump_filters_version()
+    cache.invalidate(f'book:{instance.id}', 'book-lists')
+    invalidate_book_readers(instance.id)
+
+
+@receiver(post_save, sender=BookGenre)
+def book_genre_saved(sender, instance, **kwargs):
+    facet_index.update_link('genres', instance.genre.name, instance.book_id, True)
+    bump_filters_version()
+    cache.invalidate(f'book:{instance.book_id}', 'book-lists')
+    invalidate_book_readers(instance.book_id)
+
+
+@receiver(post_delete, sender=BookGenre)
+def book_genre_deleted(sender, instance, **kwargs):
+    facet_index.update_link('genres', instance.genre.name, instance.book_id, False)
+    bump_filters_version()
+    cache.invalidate(f'book:{instance.book_id}', 'book-lists')
+    invalidate_book_readers(instance.book_id)
+
+
+@receiver(post_save, sender=BookTrope)
+def book_trope_saved(sender, instance, **kwargs):
+    facet_index.update_link('tropes', instance.trope.name, instance.book_id, True)
+    bump_filters_version()
+    cache.invalidate(f'book:{instance.book_id}', 'book-lists')
+    invalidate_book_readers(instance.book_id)
+
+
+@receiver(post_delete, sender=BookTrope)
+def book_trope_deleted(sender, instance, **kwargs):
+    facet_index.update_link('tropes', instance.trope.name, instance.book_id, False)
+    bump_filters_version()
+    cache.invalidate(f'book:{instance.book_id}', 'book-lists')
+    invalidate_book_readers(instance.book_id)
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_save, sender=Trope)
+@receiver(post_delete, sender=Genre)
+@receiver(post_delete, sender=Trope)
+def taxonomy_changed(sender, **kwargs):
+    # Переименование жанра/тропа затрагивает много книг — проще перестроить индекс
+    facet_index.invalidate()
+    bump_filters_version()
+    cache.invalidate_all()
+
+
+@receiver(pre_save, sender=Comment)
+def comment_pre_save(sender, instance, **kwargs):
+    instance._previous_rating = None
+    if instance.pk:
+        instance._previous_rating = Comment.objects.filter(pk=instance.pk).values_list('rating', flat=True).first()
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    previous = None if created else getattr(instance, '_previous_rating', None)
+    current = int(instance.rating) if instance.rating is not None else None
+    if previous != current:
+        sum_delta = (current or 0) - (previous or 0)
+        count_delta = (current is not None) - (previous is not None)
+        apply_rating_delta(instance.book_id, sum_delta, count_delta)
+    refresh_popularity(Book.objects.filter(pk=instance.book_id))
+    if created and instance.parent_id:
+        Comment.objects.filter(pk=instance.parent_id).update(reply_count=F('reply_count') + 1)
+    cache.invalidate(f'book:{instance.book_id}:comments', f'book:{instance.book_id}', 'book-lists')
+    invalidate_book_readers(instance.book_id)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    if instance.parent_id:
+        # При каскадном удалении ветки родителя уже нет — update ничего не изменит
+        Comment.objects.filter(pk=instance.parent_id).update(reply_count=F('reply_count') - 1)
+    if instance.rating is not None:
+        apply_rating_delta(instance.book_id, -int(instance.rating), -1)
+    refresh_popularity(Book.objects.filter(pk=instance.book_id))
+    cache.invalidate(f'book:{instance.book_id}:comments', f'book:{instance.book_id}', 'book-lists')
+    invalidate_book_readers(instance.book_id)
+
+
+@receiver(post_save, sender=FavoriteBook)
+@receiver(post_delete, sender=FavoriteBook)
+def favorite_changed(sender, instance, **kwargs):
+    refresh_popularity(Book.objects.filter(pk=instance.book_id))
+    cache.invalidate(f'favorites:{instance.user_id}')
+    cache.invalidate_user(instance.user_id)
+
+
+@receiver(post_save, sender=ReadingProgress)
+@receiver(post_delete, sender=ReadingProgress)
+@receiver(post_save, sender=Chart)
+@receiver(post_delete, sender=Chart)
+def user_data_changed(sender, instance, **kwargs):
+    cache.invalidate_user(instance.user_id)
+
+
+@receiver(post_save, sender=ChartBook)
+@receiver(post_delete, sender=ChartBook)
+def chart_book_changed(sender, instance, **kwargs):
+    # Подборка могла быть уже удалена каскадом — тогда сброс сделал сигнал Chart
+    user_id = Chart.objects.filter(pk=instance.chart_id).values_list('user_id', flat=True).first()
+    if user_id is not None:
+        cache.invalidate_user(user_id)
+
+
+@receiver(post_save, sender=BookCollection)
+@receiver(post_delete, sender=BookCollection)
+def collection_changed(sender, instance, **kwargs):
+    cache.invalidate('collections', f'collection:{instance.id}')
+
+
+@receiver(post_save, sender=CollectionBook)
+@receiver(post_delete, sender=CollectionBook)
+def collection_book_changed(sender, instance, **kwargs):
+    cache.invalidate('collections', f'collection:{instance.collection_id}')
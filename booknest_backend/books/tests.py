@@ -1,3 +1,776 @@
-from django.test import TestCase
+import csv
+import os
+import tempfile
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import serializers
+
+from accounts.authentication import UserRefreshToken
+from accounts.models import User
+from .models import (
+    Book, Genre, Trope, BookGenre, BookTrope, Comment, FavoriteBook,
+    Chart, ChartBook, BookCollection, CollectionBook, ReadingProgress, ReadingEvent,
+    ReadingPosition, DailyReadingStats, ReadingStreak, BookReadingStats
+)
+from . import facets
+from .pagination import encode_cursor
+from .progress import ProgressBuffer
+from .reading_stats import COMMIT_LAG, aggregate_events, current_streak, ensure_partitions, record_events
+
+
+def clear_caches():
+    for alias in settings.CACHES:
+        caches[alias].clear()
+
+
+def create_books(count, genres=(), tropes=()):
+    books = Book.objects.bulk_create([
+        Book(
+            title=f'Book {i}', author=f'Author {i % 7}', description='Description',
+            country='KZ', year=2000 + i % 20, pages=100 + i, age_rating='12+'
+        )
+        for i in range(count)
+    ])
+    BookGenre.objects.bulk_create([BookGenre(book=book, genre=genre) for book in books for genre in genres])
+    BookTrope.objects.bulk_create([BookTrope(book=book, trope=trope) for book in books for trope in tropes])
+    return books
+
+
+def auth_header(user):
+    return {'HTTP_AUTHORIZATION': f'Bearer {UserRefreshToken.for_user(user).access_token}'}
+
+
+class ConditionalGetTests(TestCase):
+    # Ответ 304 не должен сериализовать ни одной записи
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader@example.com', 'reader', 'password123')
+        cls.books = create_books(3, genres=[Genre.objects.create(name='Fantasy')])
+        cls.book = cls.books[0]
+        Comment.objects.create(user=cls.user, book=cls.book, comment='Good', rating=5)
+        FavoriteBook.objects.create(user=cls.user, book=cls.book)
+
+    def setUp(self):
+        clear_caches()
+
+    def assert_revalidated_without_serializing(self, url, **headers):
+        response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.has_header('ETag'))
+
+        # Без кэша ответов view пришлось бы сериализовать заново
+        caches[settings.RESPONSE_CACHE_ALIAS].clear()
+        caches[settings.USER_CACHE_ALIAS].clear()
+        with mock.patch.object(serializers.Serializer, 'to_representation') as to_representation, \
+                mock.patch('books.views.serialize_book_rows') as serialize_book_rows:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'], **headers)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(to_representation.call_count, 0)
+        self.assertEqual(serialize_book_rows.call_count, 0)
+
+    def test_book_list(self):
+        self.assert_revalidated_without_serializing('/api/books/')
+
+    def test_book_detail(self):
+        self.assert_revalidated_without_serializing(f'/api/books/{self.book.pk}/')
+
+    def test_comments(self):
+        self.assert_revalidated_without_serializing(f'/api/books/{self.book.pk}/comments/')
+
+    def test_favorites(self):
+        self.assert_revalidated_without_serializing('/api/user/favorites/', **auth_header(self.user))
+
+    def test_write_changes_etag(self):
+        url = f'/api/books/{self.book.pk}/'
+        etag = self.client.get(url)['ETag']
+        Book.objects.get(pk=self.book.pk).save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class QueryCountTests(TestCase):
+    # Число запросов не зависит от размера страницы и количества жанров/тропов у книг
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader@example.com', 'reader', 'password123')
+        genres = Genre.objects.bulk_create([Genre(name=f'Genre {i}') for i in range(3)])
+        tropes = Trope.objects.bulk_create([Trope(name=f'Trope {i}') for i in range(2)])
+        cls.books = create_books(30, genres=genres, tropes=tropes)
+
+    def setUp(self):
+        clear_caches()
+
+    def assert_queries(self, expected, url, **headers):
+        # Кэш ответов очищаем, чтобы view действительно выполнился
+        clear_caches()
+        with self.assertNumQueries(expected) as queries:
+            response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.executed_sql = [query['sql'] for query in queries.captured_queries]
+        return response
+
+    def create_chart(self, size):
+        chart = Chart.objects.create(user=self.user, title=f'Chart {size}')
+        ChartBook.objects.bulk_create([
+            ChartBook(chart=chart, book=book, order=i) for i, book in enumerate(self.books[:size])
+        ])
+
+    def create_collection(self, size):
+        collection = BookCollection.objects.create(title=f'Collection {size}', description='')
+        CollectionBook.objects.bulk_create([
+            CollectionBook(collection=collection, book=book, order=i) for i, book in enumerate(self.books[:size])
+        ])
+
+    def test_book_list(self):
+        for page_size in (5, 25):
+            response = self.assert_queries(4, f'/api/books/?page_size={page_size}')
+            self.assertEqual(len(response.json()['books']), page_size)
+            self.assert_queries(3, f'/api/books/?cursor=&page_size={page_size}')
+
+    def test_book_search(self):
+        for page_size in (5, 25):
+            response = self.assert_queries(4, f'/api/books/search/?genres=Genre 1&page_size={page_size}')
+            self.assertEqual(len(response.json()['books']), page_size)
+            # +1 запрос: search_books проверяет, есть ли полнотекстовые совпадения
+            self.assert_queries(4, f'/api/books/search/?query=Book&cursor=&page_size={page_size}')
+
+    def test_book_detail(self):
+        self.assert_queries(3, f'/api/books/{self.books[0].pk}/')
+        book = create_books(1)[0]
+        self.assert_queries(3, f'/api/books/{book.pk}/')
+
+    def test_charts(self):
+        headers = auth_header(self.user)
+        self.create_chart(2)
+        self.assert_queries(5, '/api/user/charts/', **headers)
+        self.create_chart(20)
+        self.create_chart(10)
+        response = self.assert_queries(5, '/api/user/charts/', **headers)
+        self.assertEqual(len(response.json()), 3)
+
+    def test_collections(self):
+        self.create_collection(2)
+        self.assert_queries(4, '/api/collections/')
+        self.create_collection(20)
+        self.create_collection(10)
+        response = self.assert_queries(4, '/api/collections/')
+        self.assertEqual(len(response.json()), 3)
+
+    def test_book_batch(self):
+        for size in (5, 25):
+            ids = [book.pk for book in reversed(self.books[:size])] + [0]
+            response = self.assert_queries(3, f'/api/books/batch/?ids={",".join(map(str, ids))}')
+            self.assertEqual([book['id'] for book in response.json()['books']], ids[:-1])
+            self.assertEqual(response.json()['missing'], [0])
+
+            with self.assertNumQueries(3):
+                response = self.client.post('/api/books/batch/', {'ids': ids}, content_type='application/json')
+            self.assertEqual(len(response.json()['books']), size)
+
+    def test_sparse_fieldsets(self):
+        # Без genre/tropes не нужны и prefetch-запросы; description не читается из БД
+        for page_size in (5, 25):
+            response = self.assert_queries(2, f'/api/books/?fields=id,title&page_size={page_size}')
+            self.assertEqual(set(response.json()['books'][0]), {'id', 'title'})
+            self.assertFalse(any('description' in sql for sql in self.executed_sql))
+
+            response = self.assert_queries(3, f'/api/books/?view=card&cursor=&page_size={page_size}')
+            self.assertNotIn('description', response.json()['books'][0])
+            self.assertFalse(any('description' in sql for sql in self.executed_sql))
+
+    def test_include_is_favorite(self):
+        headers = auth_header(self.user)
+        favorite = self.books[-1]
+        FavoriteBook.objects.create(user=self.user, book=favorite)
+        for page_size in (5, 25):
+            # Флаг считается подзапросом EXISTS в том же SELECT; +1 запрос — claims пользователя
+            response = self.assert_queries(5, f'/api/books/?include=is_favorite&page_size={page_size}', **headers)
+            flags = {book['id']: book['is_favorite'] for book in response.json()['books']}
+            self.assertEqual([book_id for book_id, flag in flags.items() if flag], [favorite.pk])
+
+
+class KeysetPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader@example.com', 'reader', 'password123')
+        cls.books = create_books(7)
+        Comment.objects.create(user=cls.user, book=cls.books[0], comment='Good', rating=5)
+
+    def setUp(self):
+        clear_caches()
+
+    def walk(self, url):
+        ids, cursor = [], ''
+        while cursor is not None:
+            response = self.client.get(f'{url}&cursor={cursor}')
+            self.assertEqual(response.status_code, 200, response.content)
+            ids += [book['id'] for book in response.json()['books']]
+            cursor = response.json()['next_cursor']
+        return ids
+
+    def test_pages_cover_every_book_once(self):
+        expected = sorted(book.pk for book in self.books)
+        self.assertEqual(sorted(self.walk('/api/books/?page_size=3')), expected)
+        for sort_by in ('rating', 'title', 'year', 'popular'):
+            self.assertEqual(sorted(self.walk(f'/api/books/search/?sort_by={sort_by}&page_size=3')), expected)
+
+    def test_tampered_cursor(self):
+        # Курсоры декодируются, но значения не подходят под поля сортировки
+        cursors = [
+            encode_cursor(['x', 1]),
+            encode_cursor(['2024-01-01T00:00:00+00:00', 'x']),
+            encode_cursor(['2024-01-01T00:00:00+00:00', 10 ** 30]),
+            encode_cursor([None, 1]),
+            encode_cursor([[1], 1]),
+            encode_cursor([1]),
+            'not a cursor',
+        ]
+        book_pk = self.books[0].pk
+        for cursor in cursors:
+            for url in (
+                '/api/books/', '/api/books/search/?sort_by=rating', '/api/books/search/?query=Book&sort_by=relevance',
+                f'/api/books/{book_pk}/comments/', f'/api/books/{book_pk}/comments/1/replies/',
+            ):
+                separator = '&' if '?' in url else '?'
+                response = self.client.get(f'{url}{separator}cursor={cursor}')
+                self.assertEqual(response.status_code, 400, (url, cursor, response.content))
+                self.assertEqual(response.json(), {'error': 'Invalid cursor'})
+
+
+class CommentThreadTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader@example.com', 'reader', 'password123')
+        cls.book = create_books(1)[0]
+
+    def setUp(self):
+        clear_caches()
+
+    def post_comment(self, **data):
+        response = self.client.post(
+            f'/api/books/{self.book.pk}/comments/', data, content_type='application/json', **auth_header(self.user)
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()
+
+    def walk(self, url, key):
+        ids, cursor = [], ''
+        while cursor is not None:
+            response = self.client.get(f'{url}?page_size=2&cursor={cursor}')
+            self.assertEqual(response.status_code, 200, response.content)
+            ids += [comment['id'] for comment in response.json()[key]]
+            cursor = response.json()['next_cursor']
+        return ids
+
+    def test_replies_join_root_thread(self):
+        root = self.post_comment(comment='Review', rating=4)
+        reply = self.post_comment(comment='Reply', rating=5, parent_id=root['id'])
+        # Ответ на ответ остаётся в ветке отзыва, оценка в ответах не ставится
+        nested = self.post_comment(comment='Nested', parent_id=reply['id'])
+        self.assertEqual(reply['parent_id'], root['id'])
+        self.assertEqual(nested['parent_id'], root['id'])
+        self.assertIsNone(reply['rating'])
+
+        self.book.refresh_from_db()
+        self.assertEqual((self.book.rating_count, self.book.rating), (1, Decimal('4.00')))
+
+        comments = self.client.get(f'/api/books/{self.book.pk}/comments/').json()['comments']
+        self.assertEqual([(c['id'], c['reply_count']) for c in comments], [(root['id'], 2)])
+        replies = self.client.get(f'/api/books/{self.book.pk}/comments/{root["id"]}/replies/').json()['replies']
+        self.assertEqual([r['id'] for r in replies], [reply['id'], nested['id']])
+
+        Comment.objects.get(pk=reply['id']).delete()
+        self.assertEqual(Comment.objects.get(pk=root['id']).reply_count, 1)
+
+    def test_reply_to_other_book_comment(self):
+        other = Comment.objects.create(user=self.user, book=create_books(1)[0], comment='Elsewhere')
+        response = self.client.post(
+            f'/api/books/{self.book.pk}/comments/', {'comment': 'Reply', 'parent_id': other.pk},
+            content_type='application/json', **auth_header(self.user)
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Comment.objects.filter(book=self.book).exists())
+
+    def test_comment_pages(self):
+        comments = [self.post_comment(comment=f'Review {i}')['id'] for i in range(5)]
+        root = comments[0]
+        replies = [self.post_comment(comment=f'Reply {i}', parent_id=root)['id'] for i in range(5)]
+
+        # Отзывы — от новых к старым, ответы в ветке — по порядку
+        self.assertEqual(self.walk(f'/api/books/{self.book.pk}/comments/', 'comments'), comments[::-1])
+        self.assertEqual(self.walk(f'/api/books/{self.book.pk}/comments/{root}/replies/', 'replies'), replies)
+
+
+@override_settings(BOOKS_FACET_INDEX=True)
+class FacetSearchTests(TestCase):
+    # Поиск через фасетный индекс отвечает так же, как SQL-путь
+
+    @classmethod
+    def setUpTestData(cls):
+        genres = Genre.objects.bulk_create([Genre(name=f'Genre {i}') for i in range(3)])
+        tropes = Trope.objects.bulk_create([Trope(name=f'Trope {i}') for i in range(2)])
+        books = create_books(12)
+        BookGenre.objects.bulk_create([
+            BookGenre(book=book, genre=genre) for i, book in enumerate(books) for genre in genres[:i % 3 + 1]
+        ])
+        BookTrope.objects.bulk_create([BookTrope(book=book, trope=tropes[i % 2]) for i, book in enumerate(books)])
+        for i, book in enumerate(books):
+            book.country = ('KZ', 'RU', 'US')[i % 3]
+        Book.objects.bulk_update(books, ['country'])
+
+    def setUp(self):
+        clear_caches()
+        facets.facet_index.rebuild()
+
+    def tearDown(self):
+        facets.facet_index.invalidate()
+
+    def search(self, params):
+        clear_caches()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/api/books/search/?facets=true&page_size=100&{params}')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.executed_sql = [query['sql'] for query in queries.captured_queries]
+        return response.json()
+
+    def expected(self, params):
+        with override_settings(BOOKS_FACET_INDEX=False):
+            return self.search(params)
+
+    def test_matches_sql_filters_and_counts(self):
+        for params in (
+            'genres=Genre 2', 'genres=Genre 1,Genre 2&tropes=Trope 0', 'countries=KZ,US&genres=Genre 0',
+            'year_from=2005&genres=Genre 1', 'query=Book&countries=RU',
+        ):
+            result = self.search(params)
+            self.assertTrue(any('= ANY(' in sql for sql in self.executed_sql), params)
+            expected = self.expected(params)
+            self.assertEqual(result['books'], expected['books'], params)
+            self.assertEqual(result['total'], expected['total'], params)
+
+    def test_counts_match_sql_counts(self):
+        filters = {'genres': ['Genre 1'], 'tropes': [], 'countries': ['KZ', 'RU'], 'authors': [], 'age_rating': []}
+        self.assertEqual(
+            facets.facet_index.counts(filters),
+            facets.sql_counts(Book.objects.all(), filters)
+        )
+        restricted = Book.objects.filter(year__gte=2005)
+        self.assertEqual(
+            facets.facet_index.counts(filters, list(restricted.values_list('id', flat=True))),
+            facets.sql_counts(restricted, filters)
+        )
+
+    def test_broad_matches_fall_back_to_sql(self):
+        params = 'genres=Genre 0&year_from=2003'
+        with mock.patch.object(facets, 'MAX_INDEX_IDS', 3):
+            result = self.search(params)
+        self.assertFalse(any('= ANY(' in sql for sql in self.executed_sql))
+        self.assertEqual(result, self.search(params))
+
+
+class RatingAggregateTests(TestCase):
+    # rating_sum/rating_count меняются дельтами из сигналов и пересчитываются командой
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader@example.com', 'reader', 'password123')
+        cls.other = User.objects.create_user('other@example.com', 'other', 'password123')
+
+    def setUp(self):
+        self.book = create_books(1)[0]
+
+    def assert_rating(self, rating_sum, rating_count, rating, book=None):
+        book = Book.objects.get(pk=(book or self.book).pk)
+        self.assertEqual((book.rating_sum, book.rating_count, book.rating), (rating_sum, rating_count, Decimal(rating)))
+
+    def test_create(self):
+        Comment.objects.create(user=self.user, book=self.book, comment='Good', rating=5)
+        self.assert_rating(5, 1, '5.00')
+        Comment.objects.create(user=self.other, book=self.book, comment='Fine', rating=4)
+        self.assert_rating(9, 2, '4.50')
+        # Ответ без оценки не меняет агрегаты
+        Comment.objects.create(user=self.other, book=self.book, comment='Reply', rating=None)
+        self.assert_rating(9, 2, '4.50')
+
+    def test_update(self):
+        first = Comment.objects.create(user=self.user, book=self.book, comment='Good', rating=5)
+        second = Comment.objects.create(user=self.other, book=self.book, comment='Fine', rating=4)
+        second.rating = 2
+        second.save()
+        self.assert_rating(7, 2, '3.50')
+        first.comment = 'Edited'
+        first.save()
+        self.assert_rating(7, 2, '3.50')
+        second.rating = None
+        second.save()
+        self.assert_rating(5, 1, '5.00')
+        second.rating = 1
+        second.save()
+        self.assert_rating(6, 2, '3.00')
+
+    def test_delete(self):
+        first = Comment.objects.create(user=self.user, book=self.book, comment='Good', rating=5)
+        second = Comment.objects.create(user=self.other, book=self.book, comment='Fine', rating=2)
+        first.delete()
+        self.assert_rating(2, 1, '2.00')
+        second.delete()
+        self.assert_rating(0, 0, '0.00')
+
+    def test_rebuild(self):
+        Comment.objects.create(user=self.user, book=self.book, comment='Good', rating=5)
+        Comment.objects.create(user=self.other, book=self.book, comment='Fine', rating=4)
+        unrated = create_books(1)[0]
+        # Агрегаты разошлись с комментариями (например, после ручной правки в БД)
+        Book.objects.filter(pk=self.book.pk).update(rating_sum=1, rating_count=7, rating=Decimal('1.11'))
+        Book.objects.filter(pk=unrated.pk).update(rating_sum=3, rating_count=1, rating=Decimal('3.00'))
+        call_command('rebuild_rating_aggregates', stdout=StringIO())
+        self.assert_rating(9, 2, '4.50')
+        self.assert_rating(0, 0, '0.00', book=unrated)
+
+
+class ImportBooksTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader@example.com', 'reader', 'password123')
+        Genre.objects.create(name='Fantasy')
+
+    def write_csv(self, rows):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'books.csv')
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=[
+                'title', 'author', 'description', 'country', 'year', 'pages', 'age_rating',
+                'rating', 'rating_count', 'genres', 'tropes'
+            ])
+            writer.writeheader()
+            writer.writerows(rows)
+        return path
+
+    def import_books(self, rows, method):
+        call_command(
+            'import_books', self.write_csv(rows), '--method', method, '--create-missing', '--batch-size', '2',
+            stdout=StringIO()
+        )
+
+    def test_copy_and_bulk_import_the_same_rows(self):
+        rows = [
+            {'title': 'Quotes "and", commas', 'author': 'Author', 'description': '', 'country': 'KZ',
+             'year': '2001', 'pages': '300', 'age_rating': '12+', 'rating': '4.37', 'rating_count': '10',
+             'genres': 'Fantasy|Mystery', 'tropes': 'Enemies to lovers'},
+            {'title': 'Multi\nline', 'author': 'Author', 'description': 'Ночь\nи день', 'country': '',
+             'year': '1999', 'pages': '120', 'age_rating': '', 'rating': '3.5', 'rating_count': '',
+             'genres': '', 'tropes': ''},
+            {'title': 'Unrated', 'author': 'Author', 'description': 'D', 'country': 'RU',
+             'year': '2020', 'pages': '90', 'age_rating': '6+', 'rating': '', 'rating_count': '',
+             'genres': 'Fantasy', 'tropes': ''},
+        ]
+        fields = (
+            'title', 'description', 'country', 'age_rating', 'rating', 'rating_sum', 'rating_count',
+            'imported_rating_sum', 'imported_rating_count'
+        )
+        imported = {}
+        for method in ('copy', 'bulk'):
+            self.import_books(rows, method)
+            books = Book.objects.order_by('id').reverse()[:3][::-1]
+            imported[method] = [
+                ({field: getattr(book, field) for field in fields},
+                 sorted(book.book_genres.values_list('genre__name', flat=True)),
+                 list(book.book_tropes.values_list('trope__name', flat=True)))
+                for book in books
+            ]
+        self.assertEqual(imported['copy'], imported['bulk'])
+        first, second, third = [values for values, _, _ in imported['copy']]
+        self.assertEqual((first['title'], first['description']), ('Quotes "and", commas', ''))
+        self.assertEqual(
+            (first['rating'], first['rating_sum'], first['rating_count']), (Decimal('4.37'), Decimal('43.70'), 10)
+        )
+        self.assertEqual((second['rating_sum'], second['rating_count'], second['age_rating']), (Decimal('3.50'), 1, '0+'))
+        self.assertEqual((third['rating'], third['rating_count']), (Decimal('0.00'), 0))
+        self.assertEqual(imported['copy'][0][1:], (['Fantasy', 'Mystery'], ['Enemies to lovers']))
+
+    def test_comment_rating_averages_into_imported_rating(self):
+        self.import_books([
+            {'title': 'Imported', 'author': 'Author', 'description': 'D', 'country': 'KZ', 'year': '2001',
+             'pages': '300', 'age_rating': '12+', 'rating': '4.37', 'rating_count': '10', 'genres': '', 'tropes': ''},
+        ], 'copy')
+        book = Book.objects.get(title='Imported')
+        Comment.objects.create(user=self.user, book=book, comment='Good', rating=5)
+        book.refresh_from_db()
+        self.assertEqual((book.rating_sum, book.rating_count, book.rating), (Decimal('48.70'), 11, Decimal('4.43')))
+
+        # Пересчёт из комментариев сохраняет импортированные оценки
+        call_command('rebuild_rating_aggregates', stdout=StringIO())
+        book.refresh_from_db()
+        self.assertEqual((book.rating_sum, book.rating_count, book.rating), (Decimal('48.70'), 11, Decimal('4.43')))
+
+    def test_malformed_rating_is_reported(self):
+        for rating in ('abc', '7', 'NaN'):
+            row = {'title': 'Bad', 'author': 'Author', 'description': 'D', 'country': 'KZ', 'year': '2001',
+                   'pages': '300', 'age_rating': '12+', 'rating': rating, 'rating_count': '', 'genres': '', 'tropes': ''}
+            with self.assertRaisesMessage(CommandError, 'Import stopped after 0 books'):
+                self.import_books([row], 'copy')
+        self.assertFalse(Book.objects.filter(title='Bad').exists())
+
+
+class RendererTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.book = create_books(1)[0]
+
+    def setUp(self):
+        clear_caches()
+
+    def test_compact_json_by_default(self):
+        response = self.client.get(f'/api/books/{self.book.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(b'\n', response.content)
+        self.assertEqual(response.json()['title'], 'Book 0')
+
+    def test_indent_is_honored(self):
+        response = self.client.get(f'/api/books/{self.book.pk}/', HTTP_ACCEPT='application/json; indent=4')
+        self.assertIn(b'\n    "', response.content)
+        self.assertEqual(response.json()['title'], 'Book 0')
+
+        # Browsable API показывает ответ с отступами
+        response = self.client.get(f'/api/books/{self.book.pk}/', HTTP_ACCEPT='text/html')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('\n    &quot;title&quot;: &quot;Book 0&quot;', response.content.decode())
+
+
+class CacheStatsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin@example.com', 'admin', 'password123')
+        cls.user = User.objects.create_user('reader@example.com', 'reader', 'password123')
+        create_books(2)
+
+    def setUp(self):
+        clear_caches()
+
+    def test_admin_only(self):
+        self.assertEqual(self.client.get('/api/cache-stats/').status_code, 401)
+        self.assertEqual(self.client.get('/api/cache-stats/', **auth_header(self.user)).status_code, 403)
+
+    def test_response_cache_hit_ratio(self):
+        headers = auth_header(self.admin)
+        before = self.client.get('/api/cache-stats/', **headers).json()['response_cache']
+        for _ in range(3):
+            self.client.get('/api/books/')
+        stats = self.client.get('/api/cache-stats/', **headers).json()['response_cache']
+        self.assertEqual((stats['hits'] - before['hits'], stats['misses'] - before['misses']), (2, 1))
+        self.assertEqual(stats['hit_ratio'], stats['hits'] / (stats['hits'] + stats['misses']))
+
+
+class UserCacheTests(TestCase):
+    # Личные ответы сбрасываются только у тех, у кого изменённая книга есть в ответе
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user('reader@example.com', 'reader', 'password123')
+        cls.other = User.objects.create_user('other@example.com', 'other', 'password123')
+        cls.admin = User.objects.create_superuser('admin@example.com', 'admin', 'password123')
+        cls.favorite, cls.unrelated = create_books(2)
+        FavoriteBook.objects.create(user=cls.reader, book=cls.favorite)
+        FavoriteBook.objects.create(user=cls.other, book=cls.unrelated)
+
+    def setUp(self):
+        clear_caches()
+
+    def cache_status(self, user, url='/api/user/favorites/'):
+        response = self.client.get(url, **auth_header(user))
+        self.assertEqual(response.status_code, 200)
+        return response['X-Cache']
+
+    def test_comment_invalidates_only_readers_of_the_book(self):
+        for user in (self.reader, self.other):
+            self.assertEqual(self.cache_status(user), 'MISS')
+            self.assertEqual(self.cache_status(user), 'HIT')
+
+        Comment.objects.create(user=self.other, book=self.favorite, comment='Good', rating=5)
+        self.assertEqual(self.cache_status(self.reader), 'MISS')
+        self.assertEqual(self.cache_status(self.other), 'HIT')
+        # В избранном уже новый рейтинг книги
+        response = self.client.get('/api/user/favorites/', **auth_header(self.reader))
+        self.assertEqual(response.json()[0]['book']['rating'], '5.00')
+
+    def test_chart_books_are_tracked(self):
+        chart = Chart.objects.create(user=self.other, title='Chart')
+        ChartBook.objects.create(chart=chart, book=self.favorite, order=0)
+        self.assertEqual(self.cache_status(self.other, '/api/user/charts/'), 'MISS')
+        self.assertEqual(self.cache_status(self.other, '/api/user/charts/'), 'HIT')
+        Book.objects.get(pk=self.favorite.pk).save()
+        self.assertEqual(self.cache_status(self.other, '/api/user/charts/'), 'MISS')
+
+    def test_invalidation_stats(self):
+        headers = auth_header(self.admin)
+        before = self.client.get('/api/cache-stats/', **headers).json()['user_cache']
+        Comment.objects.create(user=self.other, book=self.favorite, comment='Good', rating=5)
+        stats = self.client.get('/api/cache-stats/', **headers).json()['user_cache']
+        self.assertEqual(stats['invalidations'] - before['invalidations'], 1)
+        self.assertIn([self.reader.pk, dict(before['top_invalidated_users']).get(self.reader.pk, 0) + 1],
+                      stats['top_invalidated_users'])
+
+
+class ProgressBufferTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader@example.com', 'reader', 'password123')
+        cls.first, cls.second = create_books(2)
+
+    def setUp(self):
+        # Интервал больше длительности теста: пишет только явный flush() в этом соединении
+        self.buffer = ProgressBuffer(max_entries=100, flush_interval=600)
+        self.addCleanup(self.buffer.stop)
+
+    def progress(self):
+        return {
+            row.book_id: (row.current_page, row.is_current)
+            for row in ReadingProgress.objects.filter(user=self.user)
+        }
+
+    def test_updates_of_one_book_are_coalesced(self):
+        for page in (10, 11, 12):
+            self.buffer.add(self.user.pk, self.first.pk, page)
+        self.assertEqual(self.buffer.pending_count(), 1)
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(self.progress(), {self.first.pk: (12, True)})
+        self.assertEqual(list(ReadingEvent.objects.values_list('book_id', 'page')), [(self.first.pk, 12)])
+
+    def test_latest_book_becomes_current(self):
+        self.buffer.add(self.user.pk, self.first.pk, 10)
+        self.buffer.add(self.user.pk, self.second.pk, 5)
+        self.buffer.flush()
+        self.assertEqual(self.progress(), {self.first.pk: (10, False), self.second.pk: (5, True)})
+
+        self.buffer.add(self.user.pk, self.first.pk, 20)
+        self.buffer.flush()
+        self.assertEqual(self.progress(), {self.first.pk: (20, True), self.second.pk: (5, False)})
+
+    def test_size_limit_flushes_on_add(self):
+        self.buffer.max_entries = 2
+        self.buffer.add(self.user.pk, self.first.pk, 10)
+        self.assertEqual(self.buffer.pending_count(), 1)
+        self.buffer.add(self.user.pk, self.second.pk, 5)
+        self.assertEqual(self.buffer.pending_count(), 0)
+        self.assertEqual(len(self.progress()), 2)
+
+
+class ProgressBufferFlusherTests(TransactionTestCase):
+    # Фоновый поток пишет через своё соединение, поэтому данные должны быть закоммичены
+
+    def test_pending_progress_is_flushed_on_interval(self):
+        user = User.objects.create_user('reader@example.com', 'reader', 'password123')
+        book = create_books(1)[0]
+        buffer = ProgressBuffer(max_entries=100, flush_interval=0.2)
+        self.addCleanup(buffer.stop)
+
+        buffer.add(user.pk, book.pk, 42)
+        # Новых add() нет, но запись всё равно должна уйти в БД
+        deadline = time.monotonic() + 5
+        while not ReadingProgress.objects.exists() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(buffer.pending_count(), 0)
+        self.assertEqual(
+            list(ReadingProgress.objects.values_list('current_page', 'is_current')), [(42, True)]
+        )
+
+
+class ReadingAggregationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user('reader@example.com', 'reader', 'password123')
+        cls.other = User.objects.create_user('other@example.com', 'other', 'password123')
+        cls.book = create_books(1)[0]
+
+    def record(self, user, page, days_ago):
+        record_events([(user.pk, self.book.pk, page, timezone.now() - timedelta(days=days_ago))])
+        return ReadingEvent.objects.latest('id')
+
+    def settle(self, *events):
+        # Событие старше COMMIT_LAG: его транзакция точно закоммичена
+        ids = [event.id for event in events] or ReadingEvent.objects.values_list('id', flat=True)
+        ReadingEvent.objects.filter(id__in=ids).update(
+            inserted_at=timezone.now() - COMMIT_LAG - timedelta(seconds=1)
+        )
+
+    def daily_pages(self, user):
+        today = timezone.localdate()
+        return {
+            (today - row.date).days: row.pages_read
+            for row in DailyReadingStats.objects.filter(user=user)
+        }
+
+    def test_events_are_rolled_up(self):
+        self.record(self.reader, 10, days_ago=2)
+        self.record(self.reader, 30, days_ago=1)
+        # Возврат назад не добавляет страниц
+        self.record(self.reader, 20, days_ago=1)
+        self.record(self.other, 40, days_ago=0)
+        self.settle()
+        self.assertEqual(aggregate_events(), 4)
+
+        self.record(self.reader, self.book.pages, days_ago=0)
+        self.settle()
+        self.assertEqual(aggregate_events(), 1)
+        self.assertEqual(aggregate_events(), 0)
+
+        self.assertEqual(self.daily_pages(self.reader), {2: 10, 1: 20, 0: self.book.pages - 30})
+        self.assertEqual(self.daily_pages(self.other), {0: 40})
+        positions = {
+            row.user_id: (row.max_page, row.completed)
+            for row in ReadingPosition.objects.filter(book=self.book)
+        }
+        self.assertEqual(positions, {self.reader.pk: (self.book.pages, True), self.other.pk: (40, False)})
+        stats = BookReadingStats.objects.get(book=self.book)
+        self.assertEqual((stats.readers, stats.completed), (2, 1))
+        streak = ReadingStreak.objects.get(user=self.reader)
+        self.assertEqual((streak.current_streak, streak.longest_streak), (3, 3))
+        self.assertEqual(current_streak(streak), 3)
+
+    def test_watermark_waits_for_recent_events(self):
+        recent = self.record(self.reader, 10, days_ago=0)
+        settled = self.record(self.reader, 30, days_ago=0)
+        self.settle(settled)
+        # Более позднее событие не обгоняет ещё не устоявшееся
+        self.assertEqual(aggregate_events(), 0)
+        self.settle(recent)
+        self.assertEqual(aggregate_events(), 2)
+        self.assertEqual(self.daily_pages(self.reader), {0: 30})
+
+    def test_partition_takes_over_rows_from_default(self):
+        months_ahead = 6
+        event = self.record(self.reader, 10, days_ago=-31 * months_ahead)
+        partition = f'reading_event_{event.created_date:%Y_%m}'
+
+        def table_of(event_id):
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT tableoid::regclass::text FROM reading_event WHERE id = %s', [event_id])
+                return cursor.fetchone()[0]
+
+        self.assertEqual(table_of(event.id), 'reading_event_default')
+        ensure_partitions(months_ahead=months_ahead + 1)
+        self.assertEqual(table_of(event.id), partition)
+        self.assertEqual(ReadingEvent.objects.filter(id=event.id).count(), 1)
@@ -1,26 +1,31 @@
 from django.urls import path
 from .views import (
-    BookListView, BookDetailView, BookSearchView,
-    FavoriteBooksView, FavoriteBookDetailView, CheckFavoriteView,
-    CurrentBookView, ReadingProgressView,
+    BookListView, BookDetailView, BookBatchView, BookSearchView,
+    FavoriteBooksView, FavoriteBookDetailView, CheckFavoritesView, CheckFavoriteView,
+    CurrentBookView, ReadingProgressView, ReadingStatsView, BookReadingStatsView,
     UserChartsView, ChartDetailView, ChartBooksView, ChartBookDetailView,
-    ChartCoverUploadView, BookCommentsView,
-    CollectionsView, CollectionDetailView, FiltersView
+    ChartCoverUploadView, BookCommentsView, CommentRepliesView,
+    CollectionsView, CollectionDetailView, FiltersView, CacheStatsView
 )
 
 urlpatterns = [
     # Books
     path('books/', BookListView.as_view(), name='book-list'),
     path('books/<int:pk>/', BookDetailView.as_view(), name='book-detail'),
+    path('books/batch/', BookBatchView.as_view(), name='book-batch'),
     path('books/search/', BookSearchView.as_view(), name='book-search'),
     path('books/<int:book_pk>/comments/', BookCommentsView.as_view(), name='book-comments'),
+    path('books/<int:book_pk>/comments/<int:comment_pk>/replies/', CommentRepliesView.as_view(), name='comment-replies'),
+    path('books/<int:book_pk>/reading-stats/', BookReadingStatsView.as_view(), name='book-reading-stats'),
     
     # User endpoints (они здесь!)
     path('user/favorites/', FavoriteBooksView.as_view(), name='favorites'),
+    path('user/favorites/check/', CheckFavoritesView.as_view(), name='check-favorites'),
     path('user/favorites/<int:pk>/', FavoriteBookDetailView.as_view(), name='favorite-detail'),
     path('user/favorites/<int:pk>/check/', CheckFavoriteView.as_view(), name='check-favorite'),
     path('user/current-book/', CurrentBookView.as_view(), name='current-book'),
     path('user/reading-progress/', ReadingProgressView.as_view(), name='reading-progress'),
+    path('user/reading-stats/', ReadingStatsView.as_view(), name='reading-stats'),
     path('user/charts/', UserChartsView.as_view(), name='user-charts'),
     path('user/charts/<int:pk>/', ChartDetailView.as_view(), name='chart-detail'),
     path('user/charts/<int:chart_pk>/books/', ChartBooksView.as_view(), name='chart-books'),
@@ -32,8 +37,12 @@ urlpatterns = [
     path('collections/<int:pk>/', CollectionDetailView.as_view(), name='collection-detail'),
     
     # Filters 
+    path('filters/', FiltersView.as_view(), kwargs={'filter_type': 'all'}),
     path('filters/tropes/', FiltersView.as_view(), kwargs={'filter_type': 'tropes'}),
     path('filters/genres/', FiltersView.as_view(), kwargs={'filter_type': 'genres'}),
     path('filters/authors/', FiltersView.as_view(), kwargs={'filter_type': 'authors'}),
     path('filters/countries/', FiltersView.as_view(), kwargs={'filter_type': 'countries'}),
+    
+    # Monitoring (admin only)
+    path('cache-stats/', CacheStatsView.as_view(), name='cache-stats'),
 ]
\ No newline at end of file
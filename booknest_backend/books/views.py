@@ -1,40 +1,127 @@
-from rest_framework import status, generics
+import os
+from datetime import timedelta
+
+from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated, AllowAny
-from django.db.models import Q, Avg
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
+from django.db.models import Exists, OuterRef
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from .models import (
-    Book, Genre, Trope, FavoriteBook, ReadingProgress,
-    Chart, ChartBook, Comment, BookCollection
+    Book, FavoriteBook, ReadingProgress,
+    Chart, ChartBook, Comment, BookCollection, taxonomy_prefetches,
+    ReadingPosition, DailyReadingStats, ReadingStreak, BookReadingStats
 )
 from .serializers import (
     BookSerializer, FavoriteBookSerializer, ReadingProgressSerializer,
-    ChartSerializer, CommentSerializer, BookCollectionSerializer
+    ChartSerializer, CommentSerializer, BookCollectionSerializer,
+    InvalidFields, get_book_fields, with_book_fields, book_values, book_rows, serialize_book_rows
+)
+from . import facets
+from .cache import cached_response, response_cache_stats, user_cache_stats
+from .conditional import tag_conditional, user_conditional, user_tags
+from .filters import FILTER_TYPES, get_vocabularies, filters_etag, filters_last_modified
+from .search import search_books
+from .progress import progress_buffer, is_enabled as progress_buffer_enabled
+from .reading_stats import record_events, current_streak
+from .pagination import (
+    KEYSET_ORDERINGS, COMMENT_ORDERING, REPLY_ORDERING, InvalidCursor, get_page_size,
+    paginate_keyset, estimate_count
+)
+
+
+MAX_IDS_PER_REQUEST = 100
+# Столбцы для CommentSerializer: автору нужны только имя и аватар
+COMMENT_FIELDS = (
+    'id', 'book_id', 'parent_id', 'comment', 'rating', 'reply_count', 'created_date',
+    'user__id', 'user__username', 'user__avatar'
 )
 
 
+class InvalidIds(ValueError):
+    pass
+
+
+def parse_ids(raw_ids):
+    # "1,2,3" из query string или список из JSON; повторы убираем, порядок сохраняем
+    if isinstance(raw_ids, str):
+        raw_ids = [value for value in raw_ids.split(',') if value.strip()]
+    try:
+        ids = list(dict.fromkeys(int(value) for value in raw_ids))
+    except (TypeError, ValueError):
+        raise InvalidIds('ids must be a list of integers')
+    if not ids:
+        raise InvalidIds('ids is required')
+    if len(ids) > MAX_IDS_PER_REQUEST:
+        raise InvalidIds(f'At most {MAX_IDS_PER_REQUEST} ids per request')
+    return ids
+
+
+def wants_favorites(request):
+    # ?include=is_favorite добавляет флаг избранного для авторизованного пользователя
+    return request.user.is_authenticated and 'is_favorite' in request.GET.get('include', '').split(',')
+
+
+def book_list_tags(request):
+    # Ответ с is_favorite личный: свой тег на пользователя, сбрасывается при изменении избранного
+    if wants_favorites(request):
+        return ['book-lists', f'favorites:{request.user.pk}']
+    return ['book-lists']
+
+
+def with_favorites(request, books, fields):
+    if not wants_favorites(request):
+        return books, fields
+    books = books.annotate(
+        is_favorite=Exists(FavoriteBook.objects.filter(user=request.user, book=OuterRef('pk')))
+    )
+    return books, fields + ['is_favorite']
+
+
 class BookListView(APIView):
     permission_classes = [AllowAny]
     
+    @tag_conditional(book_list_tags)
+    @cached_response(book_list_tags)
     def get(self, request):
         try:
-            page = int(request.GET.get('page', 1))
-            page_size = int(request.GET.get('page_size', 20))
+            page_size = get_page_size(request)
+            fields = get_book_fields(request)
+            books, fields = with_favorites(request, Book.objects.with_taxonomy(), fields)
+            
+            # Keyset-пагинация: ?cursor= (пустой курсор — первая страница)
+            if 'cursor' in request.GET:
+                ordering = KEYSET_ORDERINGS['created_date']
+                rows, next_cursor = paginate_keyset(
+                    book_values(books, ordering, fields), ordering, request.GET['cursor'], page_size
+                )
+                response_data = {
+                    'books': serialize_book_rows(rows, fields),
+                    'next_cursor': next_cursor
+                }
+                if request.GET.get('include_total') == 'true':
+                    response_data['total'] = estimate_count(books)
+                return Response(response_data)
             
-            books = Book.objects.all()
+            page = int(request.GET.get('page', 1))
             total = books.count()
             
             start = (page - 1) * page_size
             end = start + page_size
             
-            books = books[start:end]
-            serializer = BookSerializer(books, many=True)
+            books = books.order_by(*KEYSET_ORDERINGS['created_date'])[start:end]
             
             return Response({
-                'books': serializer.data,
+                'books': serialize_book_rows(book_rows(books, fields), fields),
                 'total': total
             })
+        except (InvalidCursor, InvalidFields) as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({
                 'error': str(e)
@@ -44,17 +131,57 @@ class BookListView(APIView):
 class BookDetailView(APIView):
     permission_classes = [AllowAny]
     
+    @tag_conditional(lambda request, pk: [f'book:{pk}'])
+    @cached_response(lambda request, pk: [f'book:{pk}'])
     def get(self, request, pk):
         try:
-            book = get_object_or_404(Book, pk=pk)
-            serializer = BookSerializer(book)
+            fields = get_book_fields(request)
+            book = get_object_or_404(with_book_fields(Book.objects.with_taxonomy(), fields), pk=pk)
+            serializer = BookSerializer(book, fields=fields)
             return Response(serializer.data)
+        except InvalidFields as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({
                 'error': str(e)
             }, status=status.HTTP_404_NOT_FOUND)
 
 
+class BookBatchView(APIView):
+    # Несколько книг одним запросом: GET ?ids=1,2,3 или POST {"ids": [...]} для длинных списков
+    permission_classes = [AllowAny]
+    
+    @tag_conditional(lambda request: ['book-lists'])
+    @cached_response(lambda request: ['book-lists'])
+    def get(self, request):
+        return self.lookup(request, request.GET.get('ids', ''))
+    
+    def post(self, request):
+        return self.lookup(request, request.data.get('ids', []))
+    
+    def lookup(self, request, raw_ids):
+        try:
+            ids = parse_ids(raw_ids)
+            fields = get_book_fields(request)
+            books = with_book_fields(Book.objects.with_taxonomy(), fields).in_bulk(ids)
+            
+            # Порядок ответа совпадает с порядком ids в запросе
+            return Response({
+                'books': BookSerializer([books[pk] for pk in ids if pk in books], many=True, fields=fields).data,
+                'missing': [pk for pk in ids if pk not in books]
+            })
+        except (InvalidIds, InvalidFields) as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 class BookSearchView(APIView):
     permission_classes = [AllowAny]
     
@@ -72,37 +199,14 @@ class BookSearchView(APIView):
             pages_to = request.GET.get('pages_to')
             sort_by = request.GET.get('sort_by', 'rating')
             page = int(request.GET.get('page', 1))
-            page_size = int(request.GET.get('page_size', 20))
+            page_size = get_page_size(request)
+            fields = get_book_fields(request)
             
-            books = Book.objects.all()
+            books, fields = with_favorites(request, Book.objects.with_taxonomy(), fields)
             
             # Text search
             if query:
-                books = books.filter(
-                    Q(title__icontains=query) | 
-                    Q(author__icontains=query) |
-                    Q(description__icontains=query)
-                )
-            
-            # Genre filter
-            if genres and genres[0]:
-                books = books.filter(book_genres__genre__name__in=genres).distinct()
-            
-            # Trope filter
-            if tropes and tropes[0]:
-                books = books.filter(book_tropes__trope__name__in=tropes).distinct()
-            
-            # Country filter
-            if countries and countries[0]:
-                books = books.filter(country__in=countries)
-            
-            # Author filter
-            if authors and authors[0]:
-                books = books.filter(author__in=authors)
-            
-            # Age rating filter
-            if age_rating and age_rating[0]:
-                books = books.filter(age_rating__in=age_rating)
+                books = search_books(books, query)
             
             # Year range filter
             if year_from:
@@ -116,16 +220,56 @@ class BookSearchView(APIView):
             if pages_to:
                 books = books.filter(pages__lte=int(pages_to))
             
+            facet_filters = {
+                'genres': [v for v in genres if v],
+                'tropes': [v for v in tropes if v],
+                'countries': [v for v in countries if v],
+                'authors': [v for v in authors if v],
+                'age_rating': [v for v in age_rating if v],
+            }
+            facet_counts = None
+            
+            # Пока индекс собирается в фоне, фильтры идут через SQL, а счётчики не отдаются
+            if facets.is_enabled() and facets.facet_index.is_ready():
+                # Фасетные фильтры и счётчики из in-memory индекса, без JOIN и DISTINCT
+                if request.GET.get('facets') == 'true':
+                    restrict_ids = None
+                    if query or year_from or year_to or pages_from or pages_to:
+                        restrict_ids = list(books.order_by().values_list('id', flat=True)[:facets.MAX_INDEX_IDS + 1])
+                    if restrict_ids is not None and len(restrict_ids) > facets.MAX_INDEX_IDS:
+                        facet_counts = facets.sql_counts(books, facet_filters)
+                    else:
+                        facet_counts = facets.facet_index.counts(facet_filters, restrict_ids)
+                if any(facet_filters.values()):
+                    ids = facets.facet_index.filter_ids(facet_filters)
+                    if len(ids) > facets.MAX_INDEX_IDS:
+                        books = facets.filter_queryset(books, facet_filters)
+                    else:
+                        books = facets.filter_by_ids(books, ids)
+            else:
+                books = facets.filter_queryset(books, facet_filters)
+            
             # Sorting
-            if sort_by == 'rating':
-                books = books.order_by('-rating')
-            elif sort_by == 'title':
-                books = books.order_by('title')
-            elif sort_by == 'year':
-                books = books.order_by('-year')
-            elif sort_by == 'pages':
-                books = books.order_by('-pages')
+            if sort_by == 'relevance' and query:
+                ordering = ('-rank', 'id')
+            else:
+                ordering = KEYSET_ORDERINGS.get(sort_by, KEYSET_ORDERINGS['rating'])
             
+            if 'cursor' in request.GET:
+                rows, next_cursor = paginate_keyset(
+                    book_values(books, ordering, fields), ordering, request.GET['cursor'], page_size
+                )
+                response_data = {
+                    'books': serialize_book_rows(rows, fields),
+                    'next_cursor': next_cursor
+                }
+                if request.GET.get('include_total') == 'true':
+                    response_data['total'] = estimate_count(books)
+                if facet_counts is not None:
+                    response_data['facets'] = facet_counts
+                return Response(response_data)
+            
+            books = books.order_by(*ordering)
             total = books.count()
             
             # Pagination
@@ -133,12 +277,17 @@ class BookSearchView(APIView):
             end = start + page_size
             books = books[start:end]
             
-            serializer = BookSerializer(books, many=True)
-            
-            return Response({
-                'books': serializer.data,
+            response_data = {
+                'books': serialize_book_rows(book_rows(books, fields), fields),
                 'total': total
-            })
+            }
+            if facet_counts is not None:
+                response_data['facets'] = facet_counts
+            return Response(response_data)
+        except (InvalidCursor, InvalidFields) as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({
                 'error': str(e)
@@ -148,9 +297,13 @@ class BookSearchView(APIView):
 class FavoriteBooksView(APIView):
     permission_classes = [IsAuthenticated]
     
+    @user_conditional
+    @cached_response(user_tags, alias_setting='USER_CACHE_ALIAS')
     def get(self, request):
         try:
-            favorites = FavoriteBook.objects.filter(user=request.user).select_related('book')
+            favorites = FavoriteBook.objects.filter(user=request.user).select_related('book').prefetch_related(
+                *taxonomy_prefetches('book__')
+            )
             serializer = FavoriteBookSerializer(favorites, many=True)
             return Response(serializer.data)
         except Exception as e:
@@ -194,6 +347,25 @@ class FavoriteBookDetailView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
 
 
+class CheckFavoritesView(APIView):
+    # Статус избранного для нескольких книг одним запросом: ?ids=1,2,3
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        try:
+            ids = parse_ids(request.GET.get('ids', ''))
+            favorite_ids = set(FavoriteBook.objects.filter(
+                user=request.user, book_id__in=ids
+            ).values_list('book_id', flat=True))
+            return Response({
+                'favorites': {book_id: book_id in favorite_ids for book_id in ids}
+            })
+        except Exception as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+
 class CheckFavoriteView(APIView):
     permission_classes = [IsAuthenticated]
     
@@ -210,12 +382,16 @@ class CheckFavoriteView(APIView):
 class CurrentBookView(APIView):
     permission_classes = [IsAuthenticated]
     
+    @user_conditional
+    @cached_response(user_tags, alias_setting='USER_CACHE_ALIAS')
     def get(self, request):
         try:
+            if progress_buffer_enabled():
+                progress_buffer.flush_user(request.user.pk)
             current_reading = ReadingProgress.objects.filter(
                 user=request.user,
                 is_current=True
-            ).select_related('book').first()
+            ).select_related('book').prefetch_related(*taxonomy_prefetches('book__')).first()
             
             if not current_reading:
                 return Response({
@@ -236,12 +412,23 @@ class ReadingProgressView(APIView):
     def post(self, request):
         try:
             book_id = request.data.get('book_id')
-            current_page = request.data.get('current_page', 1)
+            current_page = int(request.data.get('current_page', 1))
+            
+            if progress_buffer_enabled():
+                # Буферизованный режим: обновление пишется в БД пачкой (books/progress.py)
+                progress_buffer.add(request.user.pk, int(book_id), current_page)
+                return Response({
+                    'book_id': int(book_id),
+                    'current_page': current_page,
+                    'is_current': True
+                }, status=status.HTTP_202_ACCEPTED)
             
             book = get_object_or_404(Book, pk=book_id)
             
-            # Set all other books as not current
-            ReadingProgress.objects.filter(user=request.user).update(is_current=False)
+            # Снимаем отметку только с прежней текущей книги, а не со всех строк пользователя
+            ReadingProgress.objects.filter(user=request.user, is_current=True).exclude(book=book).update(
+                is_current=False
+            )
             
             # Create or update reading progress
             progress, created = ReadingProgress.objects.update_or_create(
@@ -252,6 +439,7 @@ class ReadingProgressView(APIView):
                     'is_current': True
                 }
             )
+            record_events([(request.user.pk, book.pk, current_page, timezone.now())])
             
             serializer = ReadingProgressSerializer(progress)
             return Response(serializer.data)
@@ -261,12 +449,56 @@ class ReadingProgressView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
 
 
+class ReadingStatsView(APIView):
+    # Статистика чтения из сводных таблиц (books/reading_stats.py), без обхода журнала событий
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        try:
+            days = max(1, min(int(request.GET.get('days', 30)), 365))
+            since = timezone.localdate() - timedelta(days=days - 1)
+            daily = DailyReadingStats.objects.filter(user=request.user, date__gte=since).order_by('date')
+            streak = ReadingStreak.objects.filter(user=request.user).first()
+            
+            return Response({
+                'daily': [{'date': row.date, 'pages_read': row.pages_read} for row in daily],
+                'current_streak': current_streak(streak),
+                'longest_streak': streak.longest_streak if streak else 0,
+                'books_completed': ReadingPosition.objects.filter(user=request.user, completed=True).count()
+            })
+        except Exception as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+
+class BookReadingStatsView(APIView):
+    permission_classes = [AllowAny]
+    
+    def get(self, request, book_pk):
+        try:
+            get_object_or_404(Book, pk=book_pk)
+            stats = BookReadingStats.objects.filter(book_id=book_pk).first() or BookReadingStats(book_id=book_pk)
+            return Response({
+                'book_id': book_pk,
+                'readers': stats.readers,
+                'completed': stats.completed,
+                'completion_rate': stats.completion_rate
+            })
+        except Exception as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_404_NOT_FOUND)
+
+
 class UserChartsView(APIView):
     permission_classes = [IsAuthenticated]
     
+    @user_conditional
+    @cached_response(user_tags, alias_setting='USER_CACHE_ALIAS')
     def get(self, request):
         try:
-            charts = Chart.objects.filter(user=request.user).prefetch_related('chart_books__book')
+            charts = Chart.objects.filter(user=request.user).with_books()
             serializer = ChartSerializer(charts, many=True)
             return Response(serializer.data)
         except Exception as e:
@@ -300,7 +532,7 @@ class ChartDetailView(APIView):
     
     def get(self, request, pk):
         try:
-            chart = get_object_or_404(Chart, pk=pk, user=request.user)
+            chart = get_object_or_404(Chart.objects.with_books(), pk=pk, user=request.user)
             serializer = ChartSerializer(chart)
             return Response(serializer.data)
         except Exception as e:
@@ -310,7 +542,7 @@ class ChartDetailView(APIView):
     
     def patch(self, request, pk):
         try:
-            chart = get_object_or_404(Chart, pk=pk, user=request.user)
+            chart = get_object_or_404(Chart.objects.with_books(), pk=pk, user=request.user)
             
             if 'title' in request.data:
                 chart.title = request.data['title']
@@ -352,7 +584,7 @@ class ChartBooksView(APIView):
                 book=book
             )
             
-            serializer = ChartSerializer(chart)
+            serializer = ChartSerializer(Chart.objects.with_books().get(pk=chart.pk))
             return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
         except Exception as e:
             return Response({
@@ -408,11 +640,25 @@ class ChartCoverUploadView(APIView):
 class BookCommentsView(APIView):
     permission_classes = [AllowAny]
     
+    @tag_conditional(lambda request, book_pk: [f'book:{book_pk}:comments'])
+    @cached_response(lambda request, book_pk: [f'book:{book_pk}:comments'])
     def get(self, request, book_pk):
         try:
-            comments = Comment.objects.filter(book_id=book_pk).select_related('user')
-            serializer = CommentSerializer(comments, many=True)
-            return Response(serializer.data)
+            # Только комментарии верхнего уровня; ответы подгружаются отдельно по ветке
+            comments = Comment.objects.filter(book_id=book_pk, parent__isnull=True).select_related('user').only(
+                *COMMENT_FIELDS
+            )
+            rows, next_cursor = paginate_keyset(
+                comments, COMMENT_ORDERING, request.GET.get('cursor'), get_page_size(request)
+            )
+            return Response({
+                'comments': CommentSerializer(rows, many=True).data,
+                'next_cursor': next_cursor
+            })
+        except InvalidCursor as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({
                 'error': str(e)
@@ -428,24 +674,23 @@ class BookCommentsView(APIView):
             book = get_object_or_404(Book, pk=book_pk)
             comment_text = request.data.get('comment')
             rating = request.data.get('rating')
+            parent_id = request.data.get('parent_id')
+            
+            if parent_id:
+                # Ветки одноуровневые: ответ на ответ попадает в ту же ветку; оценку ставят только в отзыве
+                parent = get_object_or_404(Comment, pk=parent_id, book=book)
+                parent_id = parent.parent_id or parent.id
+                rating = None
             
+            # Рейтинг книги обновляется сигналом через rating_sum/rating_count
             comment = Comment.objects.create(
                 user=request.user,
                 book=book,
+                parent_id=parent_id or None,
                 comment=comment_text,
                 rating=rating
             )
             
-            # Update book rating
-            avg_rating = Comment.objects.filter(
-                book=book,
-                rating__isnull=False
-            ).aggregate(Avg('rating'))['rating__avg']
-            
-            if avg_rating:
-                book.rating = round(avg_rating, 2)
-                book.save()
-            
             serializer = CommentSerializer(comment)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         except Exception as e:
@@ -454,12 +699,41 @@ class BookCommentsView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
 
 
+class CommentRepliesView(APIView):
+    permission_classes = [AllowAny]
+    
+    @tag_conditional(lambda request, book_pk, comment_pk: [f'book:{book_pk}:comments'])
+    @cached_response(lambda request, book_pk, comment_pk: [f'book:{book_pk}:comments'])
+    def get(self, request, book_pk, comment_pk):
+        try:
+            replies = Comment.objects.filter(book_id=book_pk, parent_id=comment_pk).select_related('user').only(
+                *COMMENT_FIELDS
+            )
+            rows, next_cursor = paginate_keyset(
+                replies, REPLY_ORDERING, request.GET.get('cursor'), get_page_size(request)
+            )
+            return Response({
+                'replies': CommentSerializer(rows, many=True).data,
+                'next_cursor': next_cursor
+            })
+        except InvalidCursor as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 class CollectionsView(APIView):
     permission_classes = [AllowAny]
     
+    @tag_conditional(lambda request: ['collections', 'book-lists'])
+    @cached_response(lambda request: ['collections', 'book-lists'])
     def get(self, request):
         try:
-            collections = BookCollection.objects.all().prefetch_related('collection_books__book')
+            collections = BookCollection.objects.with_books()
             serializer = BookCollectionSerializer(collections, many=True)
             return Response(serializer.data)
         except Exception as e:
@@ -471,9 +745,11 @@ class CollectionsView(APIView):
 class CollectionDetailView(APIView):
     permission_classes = [AllowAny]
     
+    @tag_conditional(lambda request, pk: [f'collection:{pk}', 'book-lists'])
+    @cached_response(lambda request, pk: [f'collection:{pk}', 'book-lists'])
     def get(self, request, pk):
         try:
-            collection = get_object_or_404(BookCollection, pk=pk)
+            collection = get_object_or_404(BookCollection.objects.with_books(), pk=pk)
             serializer = BookCollectionSerializer(collection)
             return Response(serializer.data)
         except Exception as e:
@@ -485,20 +761,13 @@ class CollectionDetailView(APIView):
 class FiltersView(APIView):
     permission_classes = [AllowAny]
     
+    @method_decorator(condition(etag_func=filters_etag, last_modified_func=filters_last_modified))
     def get(self, request, filter_type):
         try:
-            if filter_type == 'genres':
-                genres = Genre.objects.values_list('name', flat=True)
-                return Response(list(genres))
-            elif filter_type == 'tropes':
-                tropes = Trope.objects.values_list('name', flat=True)
-                return Response(list(tropes))
-            elif filter_type == 'countries':
-                countries = Book.objects.values_list('country', flat=True).distinct()
-                return Response(list(countries))
-            elif filter_type == 'authors':
-                authors = Book.objects.values_list('author', flat=True).distinct()
-                return Response(list(authors))
+            if filter_type == 'all':
+                return Response(get_vocabularies())
+            elif filter_type in FILTER_TYPES:
+                return Response([item['name'] for item in get_vocabularies()[filter_type]])
             else:
                 return Response({
                     'error': 'Invalid filter type'
@@ -506,4 +775,17 @@ class FiltersView(APIView):
         except Exception as e:
             return Response({
                 'error': str(e)
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class CacheStatsView(APIView):
+    # Счётчики кэша ответов и личного кэша пользователей для мониторинга. Они свои у каждого процесса:
+    # воркер, принявший запрос, отвечает за себя (pid в ответе)
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request):
+        return Response({
+            'pid': os.getpid(),
+            'response_cache': response_cache_stats(),
+            'user_cache': user_cache_stats(),
+        })
@@ -12,9 +12,16 @@ interface Comment {
     username: string;
     avatar: string;
   };
+  parent_id?: number | null;
   comment: string;
   rating?: number;
+  reply_count?: number;
   created_date: string;
+  // Ответы подгружаются по кнопке, страницами
+  replies?: Comment[];
+  repliesCursor?: string | null;
+  showReplies?: boolean;
+  isLoadingReplies?: boolean;
 }
 
 @Component({
@@ -32,6 +39,8 @@ export class BookDetailsComponent implements OnInit {
   
   // Комментарии
   comments: Comment[] = [];
+  commentsCursor: string | null = null;
+  isLoadingComments: boolean = false;
   newComment: string = '';
   newRating: number = 0;
   isSubmittingComment: boolean = false;
@@ -88,13 +97,47 @@ export class BookDetailsComponent implements OnInit {
     });
   }
 
-  loadComments(bookId: number): void {
-    this.apiService.getBookComments(bookId).subscribe({
-      next: (comments) => {
-        this.comments = comments;
+  loadComments(bookId: number, cursor?: string): void {
+    this.isLoadingComments = true;
+    this.apiService.getBookComments(bookId, cursor).subscribe({
+      next: (page) => {
+        // Первая страница заменяет список, следующие дописываются в конец
+        this.comments = cursor ? [...this.comments, ...page.comments] : page.comments;
+        this.commentsCursor = page.next_cursor;
+        this.isLoadingComments = false;
       },
       error: (error) => {
         console.error('Error loading comments:', error);
+        this.isLoadingComments = false;
+      }
+    });
+  }
+
+  loadMoreComments(): void {
+    if (!this.book || !this.commentsCursor || this.isLoadingComments) return;
+    this.loadComments(this.book.id, this.commentsCursor);
+  }
+
+  toggleReplies(comment: Comment): void {
+    comment.showReplies = !comment.showReplies;
+    if (comment.showReplies && !comment.replies) {
+      this.loadReplies(comment);
+    }
+  }
+
+  loadReplies(comment: Comment): void {
+    if (!this.book || comment.isLoadingReplies) return;
+    
+    comment.isLoadingReplies = true;
+    this.apiService.getCommentReplies(this.book.id, comment.id, comment.repliesCursor || undefined).subscribe({
+      next: (page) => {
+        comment.replies = [...(comment.replies || []), ...page.replies];
+        comment.repliesCursor = page.next_cursor;
+        comment.isLoadingReplies = false;
+      },
+      error: (error) => {
+        console.error('Error loading replies:', error);
+        comment.isLoadingReplies = false;
       }
     });
   }
@@ -1,7 +1,7 @@
 import { Injectable } from '@angular/core';
 import { HttpClient, HttpHeaders, HttpParams } from '@angular/common/http';
 import { Observable, throwError } from 'rxjs';
-import { catchError, map } from 'rxjs/operators';
+import { catchError } from 'rxjs/operators';
 import { TranslationService } from './translation';
 
 export interface Book {
@@ -64,6 +64,17 @@ export interface BookCollection {
   books: Book[];
 }
 
+// Страница комментариев или ответов; next_cursor === null — страниц больше нет
+export interface CommentPage {
+  comments: any[];
+  next_cursor: string | null;
+}
+
+export interface ReplyPage {
+  replies: any[];
+  next_cursor: string | null;
+}
+
 export interface SearchFilters {
   query?: string;
   genres?: string[];
@@ -357,10 +368,26 @@ export class ApiService {
 
   // ==================== COMMENTS ====================
   
-  getBookComments(bookId: number): Observable<any[]> {
-    return this.http.get<any[]>(`${this.apiUrl}/books/${bookId}/comments/`).pipe(
-      catchError(this.handleError)
-    );
+  getBookComments(bookId: number, cursor?: string): Observable<CommentPage> {
+    let params = new HttpParams();
+    if (cursor) {
+      params = params.set('cursor', cursor);
+    }
+    
+    return this.http.get<CommentPage>(`${this.apiUrl}/books/${bookId}/comments/`, {
+      params: params
+    }).pipe(catchError(this.handleError));
+  }
+
+  getCommentReplies(bookId: number, commentId: number, cursor?: string): Observable<ReplyPage> {
+    let params = new HttpParams();
+    if (cursor) {
+      params = params.set('cursor', cursor);
+    }
+    
+    return this.http.get<ReplyPage>(`${this.apiUrl}/books/${bookId}/comments/${commentId}/replies/`, {
+      params: params
+    }).pipe(catchError(this.handleError));
   }
 
   addComment(bookId: number, comment: string, rating?: number): Observable<any> {
@@ -571,6 +571,26 @@ export class TranslationService {
       en: 'No reviews yet. Be the first!',
       kk: 'Әлі пікірлер жоқ. Бірінші болыңыз!'
     },
+    'book.loadMoreReviews': {
+      ru: 'Показать ещё отзывы',
+      en: 'Load more reviews',
+      kk: 'Тағы пікірлер көрсету'
+    },
+    'book.showReplies': {
+      ru: 'Показать ответы',
+      en: 'Show replies',
+      kk: 'Жауаптарды көрсету'
+    },
+    'book.hideReplies': {
+      ru: 'Скрыть ответы',
+      en: 'Hide replies',
+      kk: 'Жауаптарды жасыру'
+    },
+    'book.loadMoreReplies': {
+      ru: 'Ещё ответы',
+      en: 'More replies',
+      kk: 'Тағы жауаптар'
+    },
     'book.notFound': {
       ru: 'Книга не найдена',
       en: 'Book Not Found',